@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: fetch, parse and rate latency against a local stub upstream,
+written as JSON so runs can be compared for regressions
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add telegram_stars_rates to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import telegram_stars_rates
+from telegram_stars_rates.analyzer import (
+    get_fragment_events, get_stars_rate, parse_fragment_transaction, stars_to_ton_fragment
+)
+from telegram_stars_rates.session import create_session
+from benchmark_parser import build_fixture
+from stub_upstream import StubUpstream
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def measure(func, calls, concurrency):
+    """Run func `calls` times on `concurrency` threads; return per-call ms and wall time."""
+    def timed(_):
+        start = time.perf_counter()
+        func()
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [timed(i) for i in range(calls)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed, range(calls)))
+    return latencies, time.perf_counter() - start
+
+
+def summarize(name, limit, concurrency, latencies, wall, items_per_call):
+    """One result row."""
+    return {
+        "benchmark": name,
+        "limit": limit,
+        "concurrency": concurrency,
+        "calls": len(latencies),
+        "mean_ms": statistics.mean(latencies),
+        "median_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20, method="inclusive")[18] if len(latencies) > 1 else latencies[0],
+        "max_ms": max(latencies),
+        "calls_per_s": len(latencies) / wall,
+        "events_per_s": len(latencies) * items_per_call / wall
+    }
+
+
+def run_suite(events, limits, concurrency_levels, repeat):
+    """Benchmark every function at every limit and concurrency level."""
+    results = []
+    with StubUpstream(events) as stub:
+        stub.patch_urls()
+        session = create_session(pool_size=max(concurrency_levels) * 2)
+        # Warm up connections and the price source ranking
+        get_stars_rate(limit=1, session=session, rate_limit_delay=0)
+
+        for limit in limits:
+            fixture = events[:limit]
+            latencies, wall = measure(lambda: [parse_fragment_transaction(e) for e in fixture], repeat, 1)
+            results.append(summarize("parse_fragment_transaction", limit, 1, latencies, wall, len(fixture)))
+
+            networked = {
+                "get_fragment_events": lambda: get_fragment_events(limit, rate_limit_delay=0, session=session),
+                "stars_to_ton_fragment": lambda: stars_to_ton_fragment(limit, rate_limit_delay=0, session=session),
+                "get_stars_rate": lambda: get_stars_rate(limit=limit, session=session, rate_limit_delay=0),
+            }
+            for name, func in networked.items():
+                for concurrency in concurrency_levels:
+                    latencies, wall = measure(func, repeat * concurrency, concurrency)
+                    results.append(summarize(name, limit, concurrency, latencies, wall, limit))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Rows whose median latency grew by more than `threshold` against the baseline run."""
+    previous = {(r["benchmark"], r["limit"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["benchmark"], row["limit"], row["concurrency"]))
+        if old and row["median_ms"] > old["median_ms"] * (1 + threshold):
+            regressions.append({**row, "baseline_median_ms": old["median_ms"]})
+    return regressions
+
+
+def main():
+    """Run the suite and write JSON results."""
+    parser = argparse.ArgumentParser(description="Telegram Stars Rates benchmark suite")
+    parser.add_argument("--limits", type=int_list, default=[50, 100, 500], help="Comma-separated limit sizes")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16], help="Comma-separated thread counts")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per thread for each measurement")
+    parser.add_argument("--fixture", help="tonapi events dump to replay (JSON with an 'events' list)")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown against --baseline")
+    args = parser.parse_args()
+
+    # Enough events that the largest limit is served from distinct pages
+    events = build_fixture(max(args.limits), args.fixture)
+    print(f"⏱️ Benchmarking limits {args.limits} at concurrency {args.concurrency}...", file=sys.stderr)
+    results = run_suite(events, args.limits, args.concurrency, args.repeat)
+
+    report = {
+        "version": telegram_stars_rates.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "repeat": args.repeat,
+        "results": results
+    }
+
+    for row in results:
+        print(f"{row['benchmark']:<28} limit {row['limit']:>5}  x{row['concurrency']:<3} "
+              f"median {row['median_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms  "
+              f"{row['events_per_s']:12,.0f} events/s", file=sys.stderr)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+        for row in report["regressions"]:
+            print(f"⚠️ Regression: {row['benchmark']} limit {row['limit']} x{row['concurrency']} "
+                  f"{row['baseline_median_ms']:.2f} → {row['median_ms']:.2f} ms", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of Fragment transaction parsing
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add telegram_stars_rates to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from telegram_stars_rates.analyzer import parse_fragment_transaction, parse_fragment_transactions
+from stub_upstream import load_recorded_events
+
+
+def legacy_parse_fragment_transaction(transaction):
+    """Parser as it was before the precompiled single-pass version, for comparison."""
+    try:
+        for action in transaction.get("actions", []):
+            if action.get("type") == "TonTransfer":
+                transfer = action.get("TonTransfer", {})
+                comment = transfer.get("comment", "")
+
+                stars_match = re.search(r'(\d+)\s+Telegram\s+Stars', comment)
+                if not stars_match:
+                    continue
+
+                stars = int(stars_match.group(1))
+                ton_amount = int(transfer.get("amount", 0)) / 1_000_000_000
+
+                if stars > 0 and ton_amount > 0:
+                    ref_match = re.search(r'Ref#(\w+)', comment)
+                    return {
+                        "timestamp": transaction.get("timestamp", 0),
+                        "stars": stars,
+                        "ton": ton_amount,
+                        "rate_per_star": ton_amount / stars,
+                        "reference": ref_match.group(1) if ref_match else "Unknown",
+                        "hash": transaction.get("event_id", "")
+                    }
+    except:
+        pass
+    return None
+
+
+def build_fixture(size, path=None):
+    """Recorded events (a tonapi dump or rates.json) repeated up to `size`, with 1 in 10 non-Stars events."""
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            recorded = json.load(f)["events"]
+    else:
+        recorded = load_recorded_events()
+
+    # Newest first with strictly decreasing lt, so the stub upstream can paginate it
+    lt = 60_000_000_000_000
+    events = []
+    for i in range(size):
+        lt -= 1000
+        if i % 10 == 9:
+            events.append({
+                "event_id": f"noise{i}",
+                "lt": lt,
+                "timestamp": 0,
+                "actions": [{"type": "JettonTransfer", "JettonTransfer": {"amount": "1"}}]
+            })
+        else:
+            event = dict(recorded[i % len(recorded)])
+            event["event_id"] = f"{event['event_id']}:{i}"
+            event["lt"] = lt
+            events.append(event)
+    return events
+
+
+def bench(name, func, events, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(events)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {best * 1000:8.2f} ms   {len(events) / best:12,.0f} events/s")
+    return best
+
+
+def main():
+    """Compare the legacy parser with the per-event and batch fast paths."""
+    parser = argparse.ArgumentParser(description="Fragment parser micro-benchmark")
+    parser.add_argument("--events", type=int, default=10_000, help="Fixture size")
+    parser.add_argument("--fixture", help="tonapi events dump to replay (JSON with an 'events' list)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant, best is reported")
+    args = parser.parse_args()
+
+    events = build_fixture(args.events, args.fixture)
+
+    legacy = [legacy_parse_fragment_transaction(e) for e in events]
+    fast = [parse_fragment_transaction(e) for e in events]
+    assert legacy == fast, "fast parser disagrees with the legacy parser"
+
+    print(f"⏱️ Parsing {len(events):,} events (best of {args.repeat})")
+    baseline = bench("legacy per-event", lambda evs: [legacy_parse_fragment_transaction(e) for e in evs], events, args.repeat)
+    per_event = bench("parse_fragment_transaction", lambda evs: [parse_fragment_transaction(e) for e in evs], events, args.repeat)
+    batch = bench("parse_fragment_transactions", parse_fragment_transactions, events, args.repeat)
+    print(f"🚀 Speedup: {baseline / per_event:.2f}x per-event, {baseline / batch:.2f}x batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-call latency of bare requests.get vs the pooled session
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+# Add telegram_stars_rates to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from telegram_stars_rates import analyzer
+from telegram_stars_rates.session import create_session
+from stub_upstream import StubUpstream
+
+
+def measure(func, calls):
+    """Return per-call latencies in milliseconds."""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<16} mean {statistics.mean(latencies):7.3f} ms   "
+          f"median {statistics.median(latencies):7.3f} ms   max {max(latencies):7.3f} ms")
+
+
+def main():
+    """Compare a fresh connection per call with keep-alive session reuse."""
+    parser = argparse.ArgumentParser(description="Pooled session latency benchmark")
+    parser.add_argument("--calls", type=int, default=500, help="Calls per variant")
+    args = parser.parse_args()
+
+    with StubUpstream() as stub:
+        stub.patch_urls()
+        session = create_session()
+
+        # Warm up both paths
+        requests.get(f"{stub.url}/api/v3/ticker/price")
+        analyzer.ton_to_usdt_binance(session)
+
+        # A throwaway Session per call is what bare requests.get does internally
+        bare = measure(lambda: analyzer.ton_to_usdt_binance(requests.Session()), args.calls)
+        pooled = measure(lambda: analyzer.ton_to_usdt_binance(session), args.calls)
+        events = measure(
+            lambda: analyzer.get_fragment_events(100, rate_limit_delay=0, session=session),
+            args.calls // 5
+        )
+
+    print(f"⏱️ {args.calls} calls against local stub {stub.url}")
+    report("bare requests", bare)
+    report("pooled session", pooled)
+    report("events (pooled)", events)
+    print(f"🚀 Speedup: {statistics.mean(bare) / statistics.mean(pooled):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
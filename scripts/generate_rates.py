@@ -12,6 +12,9 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from telegram_stars_rates.analyzer import get_stars_rate
+from telegram_stars_rates.backfill import parse_date
+from telegram_stars_rates.history import DAY_SECONDS, HistoryStore
+from telegram_stars_rates.pages import HISTORY_DAYS, build_api_data
 
 def main():
     """Generate rates.json file for GitHub Pages."""
@@ -54,71 +57,43 @@ def main():
             json.dump(rates_data, f, indent=2, ensure_ascii=False)
         
         # Write api.json (simplified for API consumers)
-        api_data = {
-            "usdt_per_star": rates_data["usdt_per_star"],
-            "ton_per_star": rates_data["ton_per_star"], 
-            "usdt_per_ton": rates_data["usdt_per_ton"],
-            "timestamp": rates_data["timestamp"],
-            "transactions_analyzed": rates_data.get("fragment_raw", {}).get("transactions_count", 0),
-            "source": "fragment_blockchain_analysis",
-            "rate_source": rates_data.get("binance_raw", {}).get("source", "unknown"),
-            "last_updated": rates_data["timestamp"]
-        }
+        api_data = build_api_data(rates_data)
         
         api_file = github_pages_dir / 'api.json'
         with open(api_file, 'w', encoding='utf-8') as f:
             json.dump(api_data, f, indent=2, ensure_ascii=False)
         
-        # Update historical data
+        # Update historical data (every run is kept in history.bin,
+        # history.json gets the last point of each of the last 90 days).
+        # history.bin lives outside github_pages so it is not published;
+        # CI keeps it between runs with actions/cache.
         history_file = github_pages_dir / 'history.json'
-        history_data = []
+        data_dir = Path(__file__).parent.parent / 'data'
+        data_dir.mkdir(exist_ok=True)
+        history = HistoryStore(str(data_dir / 'history.bin'))
         
-        # Load existing history
-        if history_file.exists():
+        # Seed a new binary history from an existing history.json
+        if not len(history) and history_file.exists():
             try:
                 with open(history_file, 'r', encoding='utf-8') as f:
                     history_data = json.load(f)
-                    # Validate existing data structure
-                    if not isinstance(history_data, list):
-                        history_data = []
+                if isinstance(history_data, list):
+                    print(f"📥 Imported {history.extend(history_data)} entries from {history_file}")
             except Exception as e:
                 print(f"⚠️ Could not load existing history: {e}")
-                history_data = []
         
         # Add current data point (only if we have valid rates)
         if rates_data["usdt_per_star"] > 0:
-            current_point = {
-                "date": rates_data["timestamp"][:10],  # YYYY-MM-DD format
-                "timestamp": rates_data["timestamp"],
-                "usdt_per_star": round(rates_data["usdt_per_star"], 6),
-                "ton_per_star": round(rates_data["ton_per_star"], 6),
-                "usdt_per_ton": round(rates_data["usdt_per_ton"], 3)
-            }
-            
-            today = current_point["date"]
-            
-            # Check if we already have an entry for today
-            existing_today = None
-            for i, h in enumerate(history_data):
-                if h.get("date") == today:
-                    existing_today = i
-                    break
-            
-            if existing_today is not None:
-                # Update existing entry for today (better rate data)
-                history_data[existing_today] = current_point
+            today = rates_data["timestamp"][:10]
+            day_start = parse_date(today)
+            if next(history.range(day_start, day_start + DAY_SECONDS), None):
                 print(f"📊 Updated existing entry for {today}")
             else:
-                # Add new entry for new day
-                history_data.append(current_point)
                 print(f"➕ Added new entry for {today}")
-            
-            # Sort by date and keep only last 90 days
-            history_data = sorted(history_data, key=lambda x: x["date"])
-            if len(history_data) > 90:
-                removed_count = len(history_data) - 90
-                history_data = history_data[-90:]
-                print(f"🗑️ Removed {removed_count} old entries, keeping last 90 days")
+            history.append_rates(rates_data)
+        
+        history_data = history.export_daily(HISTORY_DAYS)
+        history.close()
         
         # Save updated history
         with open(history_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Local stub of the tonapi / Binance / CoinGecko / OKX / Bybit endpoints used by the analyzer
+"""
+
+import gzip
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+RATES_FILE = Path(__file__).parent.parent / 'github_pages' / 'rates.json'
+EVENTS_PATH = re.compile(r'^/v2/accounts/[^/]+/events$')
+
+
+def load_recorded_events(path=RATES_FILE):
+    """Rebuild tonapi-shaped events from the transactions recorded in rates.json."""
+    with open(path, 'r', encoding='utf-8') as f:
+        transactions = json.load(f)["fragment_raw"]["raw_transactions"]
+
+    events = []
+    lt = 60_000_000_000_000
+    for tx in transactions:
+        lt -= 1000
+        events.append({
+            "event_id": tx["hash"],
+            "lt": lt,
+            "timestamp": tx["timestamp"],
+            "actions": [{
+                "type": "TonTransfer",
+                "status": "ok",
+                "TonTransfer": {
+                    "amount": str(round(tx["ton"] * 1_000_000_000)),
+                    "comment": f"{tx['stars']} Telegram Stars \n\nRef#{tx['reference']}"
+                }
+            }]
+        })
+    return events
+
+
+class StubUpstream:
+    """Threaded HTTP server answering like the real upstream APIs.
+
+    Usage:
+        with StubUpstream() as stub:
+            stub.patch_urls()
+    """
+
+    def __init__(self, events=None, usdt_per_ton=3.353, host='127.0.0.1', port=0):
+        self.events = events if events is not None else load_recorded_events()
+        self.usdt_per_ton = usdt_per_ton
+        self.requests_served = 0
+        # Answer this many upcoming tonapi requests with 429
+        self.throttle_next = 0
+        self.retry_after = "1"
+        # Artificial latency in seconds per request path, e.g. {"/api/v3/ticker/price": 2}
+        self.delays = {}
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def patch_urls(self):
+        """Point every upstream base URL of the package at this stub."""
+        from telegram_stars_rates import analyzer, prices
+        analyzer.TONAPI_URL = analyzer.BINANCE_URL = analyzer.COINGECKO_URL = self.url
+        prices.OKX_URL = prices.BYBIT_URL = self.url
+
+    def events_page(self, limit, before_lt=None, end_date=None):
+        """Return a tonapi events page starting strictly below `before_lt` and not after `end_date`."""
+        events = self.events
+        if before_lt:
+            events = [e for e in events if e["lt"] < before_lt]
+        if end_date is not None:
+            events = [e for e in events if e["timestamp"] <= end_date]
+        page = events[:limit]
+        return {"events": page, "next_from": page[-1]["lt"] if len(events) > limit else 0}
+
+    def klines(self, start_ms, end_ms, limit):
+        """Hourly Binance klines at a flat usdt_per_ton price."""
+        hour = 3_600_000
+        first = -(-start_ms // hour) * hour
+        price = f"{self.usdt_per_ton}"
+        return [
+            [t, price, price, price, price, "1000", t + hour - 1, "3353", 10, "500", "1676", "0"]
+            for t in range(first, end_ms + 1, hour)
+        ][:limit]
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.requests_served += 1
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path in stub.delays:
+                    time.sleep(stub.delays[url.path])
+
+                if EVENTS_PATH.match(url.path) and stub.throttle_next > 0:
+                    stub.throttle_next -= 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", stub.retry_after)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                elif EVENTS_PATH.match(url.path):
+                    before_lt = int(query.get("before_lt", ["0"])[0]) or None
+                    end_date = int(query["end_date"][0]) if "end_date" in query else None
+                    body = stub.events_page(int(query.get("limit", ["100"])[0]), before_lt, end_date)
+                elif url.path == "/api/v3/ticker/price":
+                    body = {"symbol": "TONUSDT", "price": f"{stub.usdt_per_ton}"}
+                elif url.path == "/api/v3/klines":
+                    body = stub.klines(
+                        int(query["startTime"][0]), int(query["endTime"][0]), int(query.get("limit", ["500"])[0])
+                    )
+                elif url.path == "/api/v3/simple/price":
+                    body = {"the-open-network": {"usd": stub.usdt_per_ton}}
+                elif url.path == "/api/v5/market/ticker":
+                    body = {"code": "0", "data": [{"instId": "TON-USDT", "last": f"{stub.usdt_per_ton}"}]}
+                elif url.path == "/v5/market/tickers":
+                    body = {"retCode": 0, "result": {"list": [{"symbol": "TONUSDT", "lastPrice": f"{stub.usdt_per_ton}"}]}}
+                else:
+                    self.send_error(404)
+                    return
+                self._send_json(body)
+
+            def _send_json(self, body):
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    payload = gzip.compress(payload)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -8,6 +8,10 @@ import subprocess
 import tempfile
 from pathlib import Path
 
+# Cumulative `python -X importtime` budget for the CLI entry module
+IMPORT_BUDGET_MS = 50
+HEAVY_MODULES = ("requests", "urllib3", "numpy", "sqlite3", "http.server")
+
 def run_command(cmd, description, cwd=None):
     """Run command and return success status."""
     print(f"🔧 {description}...")
@@ -68,6 +72,42 @@ print("✅ Import successful!")
         print("✅ Local package test passed!")
         return True
 
+def test_import_time():
+    """Check that importing the package and its CLI stays cheap."""
+    print("\n⏱️ Testing import time...\n")
+    
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import telegram_stars_rates.cli"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(f"❌ Import failed!\n   Error: {result.stderr.strip()}")
+        return False
+    
+    # Lines look like "import time:   self [us] | cumulative | module"
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == "telegram_stars_rates.cli":
+            cumulative_us = int(parts[1])
+    elapsed_ms = cumulative_us / 1000
+    print(f"   telegram_stars_rates.cli: {elapsed_ms:.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+    
+    check = (
+        "import sys, telegram_stars_rates, telegram_stars_rates.cli; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    loaded = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True).stdout.strip()
+    if loaded:
+        print(f"❌ Heavy modules imported eagerly: {loaded}")
+        return False
+    if elapsed_ms > IMPORT_BUDGET_MS:
+        print("❌ Import time over budget!")
+        return False
+    
+    print("✅ Import time test passed!")
+    return True
+
 def test_build_package():
     """Test package building process."""
     print("\n🔨 Testing package build...\n")
@@ -120,6 +160,10 @@ def main():
     
     success = True
     
+    # Test import time
+    if not test_import_time():
+        success = False
+    
     # Test local installation
     if not test_local_install():
         success = False
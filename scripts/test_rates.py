@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Offline checks of the rate pipeline: estimators, outlier filtering, rolling windows,
+and (against the local upstream stub) rate limiting, caching and price hedging
+
+Runs without network access: python scripts/test_rates.py (or pytest scripts/test_rates.py)
+"""
+
+import json
+import math
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from stub_upstream import StubUpstream, load_recorded_events
+import requests
+
+from telegram_stars_rates import analyzer, prices, ratelimit
+from telegram_stars_rates.analyzer import Transaction, parse_fragment_transaction, _parse_record, _summarize_transactions, _summarize_window
+from telegram_stars_rates.cache import RateCache, _freeze
+from telegram_stars_rates.diskcache import DiskCache
+from telegram_stars_rates.estimators import ESTIMATORS, DecayedMeanEstimator, MedianEstimator, RateEstimator, create_estimator
+from telegram_stars_rates.history import HistoryStore
+from telegram_stars_rates.prices import PriceAggregator
+from telegram_stars_rates.server import RateServer
+from telegram_stars_rates.outliers import HampelFilter, _mad, _median
+from telegram_stars_rates.stats import summarize_rates
+from telegram_stars_rates.store import TransactionStore
+from telegram_stars_rates.window import RollingWindow
+
+RATE = 0.00447
+UPSTREAM_URLS = ((analyzer, ("TONAPI_URL", "BINANCE_URL", "COINGECKO_URL")), (prices, ("OKX_URL", "BYBIT_URL")))
+
+@contextmanager
+def stub_upstream(**kwargs):
+    """A running StubUpstream with every upstream URL pointed at it, restored afterwards."""
+    saved = [(module, name, getattr(module, name)) for module, names in UPSTREAM_URLS for name in names]
+    with StubUpstream(**kwargs) as stub:
+        stub.patch_urls()
+        try:
+            yield stub
+        finally:
+            for module, name, value in saved:
+                setattr(module, name, value)
+
+def make_transactions(rates, start=1_700_000_000, step=60):
+    """Transaction records, one per rate, `step` seconds apart (oldest first)."""
+    return [
+        Transaction(start + i * step, 100, rate * 100, rate, f"ref{i}", f"hash{i}")
+        for i, rate in enumerate(rates)
+    ]
+
+def normal_rates(count, seed=1):
+    rng = random.Random(seed)
+    return [RATE * (1 + rng.gauss(0, 0.001)) for _ in range(count)]
+
+def test_estimators_match_reference():
+    """Every built-in estimator agrees with a direct computation."""
+    rng = random.Random(2)
+    txs = [Transaction(1_700_000_000 + i, rng.randint(50, 5000), 0.0, RATE * (1 + rng.random() / 100), "", str(i)) for i in range(301)]
+    rates = [tx.rate_per_star for tx in txs]
+    expected = {
+        "mean": statistics.fmean(rates),
+        "vwap": sum(tx.rate_per_star * tx.stars for tx in txs) / sum(tx.stars for tx in txs),
+        "median": statistics.median(rates),
+        "trimmed_mean": summarize_rates(rates, use_numpy=False)["trimmed_mean"],
+    }
+    for name, value in expected.items():
+        estimator = create_estimator(name)
+        for tx in txs:
+            estimator.add_transaction(tx)
+        assert math.isclose(estimator.value, value, rel_tol=1e-12), name
+
+    # Equal timestamps weigh equally, so the decayed mean is the plain mean
+    decayed = create_estimator("decayed")
+    for rate in rates:
+        decayed.update(rate, timestamp=0)
+    assert math.isclose(decayed.value, expected["mean"], rel_tol=1e-12)
+    assert set(ESTIMATORS) >= set(expected) | {"decayed"}
+
+def test_estimator_base_is_abstract():
+    """A subclass that does not define value cannot be instantiated."""
+    class NoValue(RateEstimator):
+        name = "no_value"
+
+    for cls in (RateEstimator, NoValue):
+        try:
+            cls()
+        except TypeError:
+            continue
+        raise AssertionError(f"{cls.__name__} was instantiated")
+
+def test_mad_matches_statistics():
+    rng = random.Random(3)
+    for _ in range(500):
+        values = sorted(rng.choice([rng.random(), 0.5]) for _ in range(rng.randint(1, 30)))
+        median = _median(values)
+        assert median == statistics.median(values)
+        assert math.isclose(_mad(values, median), statistics.median(abs(v - median) for v in values), abs_tol=1e-15)
+
+def test_hampel_rejects_spikes():
+    rates = normal_rates(200)
+    spikes = {0: 0.5, 1: 3.0, 100: 0.01, 199: 2.0}
+    for index, factor in spikes.items():
+        rates[index] *= factor
+    outliers = HampelFilter()
+    kept = list(outliers.filter(make_transactions(rates)))
+
+    assert outliers.rejected == len(spikes)
+    assert {tx.hash for tx in kept}.isdisjoint(f"hash{i}" for i in spikes)
+
+def test_hampel_follows_price_steps():
+    """A real change in price is not mistaken for outliers."""
+    outliers = HampelFilter()
+    list(outliers.filter(make_transactions([0.004] * 100 + [0.005] * 100)))
+    assert outliers.rejected == 0
+
+def test_implausible_rates_dropped_before_filter():
+    """The Hampel filter cannot judge two rates; the (0, 1] bound still drops the bad one."""
+    result = _summarize_transactions(make_transactions([5.0, RATE]))
+    assert result["ton_per_star"] == RATE
+    assert result["outliers_count"] == 1
+
+    unfiltered = _summarize_transactions(make_transactions([5.0, RATE]), outlier_filter=None)
+    assert unfiltered["ton_per_star"] == RATE
+
+def test_window_matches_batch_statistics():
+    """Running sums and the sorted copy agree with a recomputation as the window slides."""
+    txs = make_transactions(normal_rates(300, seed=4))
+    window = RollingWindow(3600, outlier_filter=None)
+    for tx in txs:
+        window.add(tx, now=tx.timestamp)
+        window.evict(now=tx.timestamp)
+        expected = summarize_rates([held.rate_per_star for held in window.transactions()], use_numpy=False)
+        summary = window.summary()
+        assert summary["count"] == expected["count"] == min(tx.timestamp - txs[0].timestamp, 3600) // 60 + 1
+        for name in ("mean", "median", "min", "max", "trimmed_mean"):
+            assert math.isclose(summary[name], expected[name], rel_tol=1e-9), name
+        assert math.isclose(summary["stddev"], expected["stddev"], rel_tol=1e-6, abs_tol=1e-12)
+
+def test_window_keeps_streaming_estimators():
+    """Estimators kept by the window match ones rebuilt from the transactions it holds."""
+    txs = make_transactions(normal_rates(300, seed=5))
+    window = RollingWindow(3600, outlier_filter=None)
+    factories = [name for name, cls in ESTIMATORS.items() if cls.removable] + [partial(DecayedMeanEstimator, half_life=600)]
+    for factory in factories:
+        window.estimator(factory)
+    assert window.estimator("decayed") is window.estimator("decayed")
+    for tx in txs:
+        window.add(tx, now=tx.timestamp)
+        window.evict(now=tx.timestamp)
+        for factory in factories:
+            expected = create_estimator(factory)
+            for held in window.transactions():
+                expected.add_transaction(held)
+            assert math.isclose(window.estimator(factory).value, expected.value, rel_tol=1e-9), factory
+
+    now = txs[-1].timestamp
+    result = _summarize_window(RollingWindow(3600, clock=lambda: now), list(reversed(txs)), "decayed")
+    assert result["estimator"] == "decayed"
+    assert math.isclose(result["ton_per_star"], window.estimator("decayed").value, rel_tol=1e-9)
+    try:
+        window.estimator(MedianEstimator)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("MedianEstimator cannot remove transactions")
+
+def test_window_rejects_outlier_in_small_refresh():
+    """A refresh bringing one bad transaction is judged against the rates already held."""
+    txs = make_transactions(normal_rates(101))
+    txs[-1] = Transaction(txs[-1].timestamp, 100, 500.0, 5.0, "spike", "spike")
+    txs.append(Transaction(txs[-1].timestamp + 60, 100, 100 * RATE * 1.5, RATE * 1.5, "jump", "jump"))
+    now = txs[-1].timestamp
+    window = RollingWindow(86400, clock=lambda: now)
+    newest_first = list(reversed(txs))
+
+    first = _summarize_window(window, newest_first[2:], "mean")
+    assert first["outliers_count"] == 0
+    for outliers_count, refresh in enumerate(([newest_first[1]], [newest_first[0]]), 1):
+        result = _summarize_window(window, refresh, "mean")
+        assert result["outliers_count"] == outliers_count
+        assert result["ton_per_star"] == first["ton_per_star"]
+        assert result["transactions_count"] == len(result["raw_transactions"]) == 100
+    # Refetching a rejected transaction does not count it again
+    assert _summarize_window(window, newest_first[:1], "mean")["outliers_count"] == 2
+
+def test_counts_cover_kept_transactions():
+    """transactions_count and raw_transactions mean the same with a limit and a window."""
+    txs = make_transactions(normal_rates(100))
+    txs[50] = Transaction(txs[50].timestamp, 100, 500.0, 5.0, "bad", "bad")
+    txs[60] = Transaction(txs[60].timestamp, 100, 100 * RATE * 3, RATE * 3, "spike", "spike")
+    newest_first = list(reversed(txs))
+    window = RollingWindow(86400, clock=lambda: txs[-1].timestamp)
+
+    for result in (_summarize_transactions(newest_first), _summarize_window(window, newest_first, "mean")):
+        assert result["outliers_count"] == 2
+        assert result["transactions_count"] == len(result["raw_transactions"]) == 98
+        assert {"bad", "spike"}.isdisjoint(tx.hash for tx in result["raw_transactions"])
+
+def test_disk_cached_fragment_keeps_records():
+    """Raw transactions read back from another process's DiskCache are Transactions again."""
+    txs = make_transactions([RATE, RATE])
+    with tempfile.TemporaryDirectory() as directory:
+        DiskCache(directory).write(("fragment",) + _freeze({"include_raw": True}), {"raw_transactions": txs})
+        cache = RateCache(backend=DiskCache(directory))
+        assert cache._fragment(include_raw=True)["raw_transactions"] == txs
+        # The public result has plain dicts, as stars_to_ton_fragment() returns
+        assert cache.fragment(include_raw=True)["raw_transactions"] == [tx.as_dict() for tx in txs]
+
+def test_public_parsing_returns_dicts():
+    """Records stay internal; the public parser returns the same data as a dict."""
+    event = load_recorded_events()[0]
+    tx = parse_fragment_transaction(event)
+    assert type(tx) is dict and "reference" in tx
+    assert tx == _parse_record(event).as_dict()
+    assert json.loads(json.dumps(tx)) == tx
+
+def test_store_backfills_older_history():
+    """A later sync asking for more rows than stored fetches the older events."""
+    with stub_upstream() as stub:
+        store = TransactionStore()
+        sync = lambda **kwargs: store.sync(rate_limit_delay=0, **kwargs)
+        sync(initial_limit=20)
+        assert len(store.transactions()) == 20
+        sync(initial_limit=60)
+        assert [tx["hash"] for tx in store.transactions()] == [e["event_id"] for e in stub.events[:60]]
+
+        since = stub.events[79]["timestamp"]
+        sync(initial_limit=None, since=since)
+        assert len(store.transactions(since=since)) == len([e for e in stub.events if e["timestamp"] >= since])
+
+        sync(initial_limit=500)
+        assert len(store.transactions()) == len(stub.events)
+        served = stub.requests_served
+        # Nothing older is left, so asking again does not refetch the history
+        sync(initial_limit=500)
+        sync(initial_limit=None, since=0)
+        assert stub.requests_served == served + 2
+
+        # New events after downtime are all fetched even when `since` is newer than the cursor
+        events = stub.events
+        stub.events = events[60:]
+        store = TransactionStore()
+        sync(initial_limit=40)
+        stub.events = events
+        sync(initial_limit=None, since=events[20]["timestamp"])
+        sync(initial_limit=80)
+        assert [tx["hash"] for tx in store.transactions(limit=80)] == [e["event_id"] for e in events[:80]]
+
+def test_rate_limit_retries_throttled_requests():
+    """429 answers are retried after Retry-After and counted."""
+    backoff = ratelimit.BACKOFF_BASE
+    ratelimit.BACKOFF_BASE = 0.0
+    try:
+        with stub_upstream() as stub:
+            stub.throttle_next, stub.retry_after = 2, "0"
+            ratelimit.stats.reset()
+            page = analyzer.get_fragment_events_page(10, rate_limit_delay=0)
+            assert len(page["events"]) == 10
+            assert stub.requests_served == 3
+            stats = ratelimit.get_rate_limit_stats()
+            assert (stats["requests"], stats["throttled"], stats["retried"]) == (3, 2, 2)
+
+            # Past MAX_ATTEMPTS the 429 is raised
+            stub.throttle_next = 10
+            ratelimit.stats.reset()
+            try:
+                analyzer.get_fragment_events_page(10, rate_limit_delay=0)
+            except requests.HTTPError as e:
+                assert e.response.status_code == 429
+            else:
+                raise AssertionError("10 throttled answers were not raised")
+            stats = ratelimit.get_rate_limit_stats()
+            assert stats["requests"] == stats["throttled"] == ratelimit.MAX_ATTEMPTS
+            assert stats["retried"] == ratelimit.MAX_ATTEMPTS - 1
+            assert stub.throttle_next == 10 - ratelimit.MAX_ATTEMPTS
+    finally:
+        ratelimit.BACKOFF_BASE = backoff
+        ratelimit.stats.reset()
+
+    # Retry-After is a floor under the jittered backoff
+    assert ratelimit.backoff_delay(0, "7") >= 7
+    assert ratelimit.retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+def test_hedge_skips_slow_source():
+    """A slow preferred source is hedged after hedge_delay and then ranked behind the winner."""
+    aggregator = PriceAggregator(sources=["binance", "okx"], hedge_delay=0.2, timeout=5)
+    with stub_upstream() as stub:
+        stub.delays["/api/v3/ticker/price"] = 2
+        start = time.monotonic()
+        result = aggregator.get_price()
+        elapsed = time.monotonic() - start
+
+    assert result["source"] == "okx"
+    assert 0.2 <= elapsed < 0.2 + 0.5, elapsed
+    assert aggregator.ranked_sources() == ["okx", "binance"]
+
+def test_cache_fresh_stale_and_single_flight():
+    """Fresh hits stay in memory, stale ones refresh once in the background, misses share one fetch."""
+    now = [0.0]
+    cache = RateCache(ton_usdt_ttl=30, stale_ttl=60, clock=lambda: now[0])
+    aggregator = PriceAggregator(sources=["okx"])
+    get = lambda: cache.ton_usdt(price_aggregator=aggregator)
+    with stub_upstream() as stub:
+        # Concurrent misses: one upstream call, every caller gets its result
+        stub.delays["/api/v5/market/ticker"] = 0.3
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: get(), range(8)))
+        assert stub.requests_served == 1
+        assert all(result is results[0] for result in results)
+
+        # Fresh hit
+        now[0] = 29
+        assert get() is results[0] and stub.requests_served == 1
+
+        # Stale: the old value is served at once while a single refresh runs
+        now[0] = 31
+        stub.usdt_per_ton = 4.0
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            stale = list(pool.map(lambda _: get(), range(8)))
+        assert time.monotonic() - start < 0.3
+        assert all(result is results[0] for result in stale)
+        deadline = time.monotonic() + 5
+        while get()["usdt_per_ton"] != 4.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert get()["usdt_per_ton"] == 4.0
+        assert stub.requests_served == 2
+
+        # Empty results are never cached
+        stub.delays.clear()
+        cache.clear()
+        stub.usdt_per_ton = 0
+        assert get() == {} and get() == {}
+        assert stub.requests_served == 4
+
+def test_server_history_survives_restart():
+    """With a HistoryStore, /history.json keeps the earlier days after a restart."""
+    with stub_upstream(), tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "history.bin")
+        history = HistoryStore(path)
+        history.append(1_700_000_000, 0.015, RATE, 3.353)
+        history.close()
+
+        history = HistoryStore(path)
+        server = RateServer(port=0, limit=20, history_store=history, rate_limit_delay=0)
+        try:
+            assert [point["date"] for point in server.history] == ["2023-11-14"]
+            server.refresh()
+            assert len(server.history) == 2
+            assert json.loads(server.documents["/history.json"].body) == server.history
+        finally:
+            server._httpd.server_close()
+            history.close()
+
+def test_hedge_losers_keep_failures():
+    """Losing a hedged race records latency but does not clear a recent failure."""
+    aggregator = PriceAggregator()
+    slow = Future()
+    aggregator._record("okx", 0.1, False)
+    aggregator._penalize_losers({slow}, {slow: ("okx", 0.0)})
+
+    health = aggregator.health["okx"]
+    assert health.failed_at is not None
+    assert health.latency is not None and health.latency > 0
+    assert aggregator.ranked_sources()[-1] == "okx"
+
+def test_history_drops_torn_record():
+    """Reopening a history with half a record appended keeps later records aligned."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "history.bin")
+        history = HistoryStore(path)
+        history.append(100, 0.015, RATE, 3.353)
+        history.close()
+        with open(path, "ab") as f:
+            f.write(b"\0" * 5)
+
+        history = HistoryStore(path)
+        assert len(history) == 1
+        history.append(200, 0.016, RATE, 3.5)
+        assert [record.timestamp for record in history.range()] == [100, 200]
+        history.close()
+
+def main():
+    """Run all tests."""
+    print("🧪 Testing rate pipeline...\n")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {type(e).__name__}: {e}")
+
+    if failed:
+        print(f"\n❌ {failed} of {len(tests)} tests failed.")
+        sys.exit(1)
+    print(f"\n🎉 All {len(tests)} tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -42,6 +42,10 @@ setup(
     ],
     python_requires=">=3.7",
     install_requires=["requests>=2.25.0"],
+    extras_require={
+        "async": ["aiohttp>=3.8.0"],
+        "numpy": ["numpy>=1.17"],
+    },
     entry_points={
         "console_scripts": [
             "telegram-stars-rates=telegram_stars_rates.cli:main",
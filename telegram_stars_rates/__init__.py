@@ -3,7 +3,51 @@
 Real-time Telegram Stars to USDT exchange rates via Fragment blockchain
 """
 
-from .analyzer import get_stars_rate, stars_to_ton_fragment, ton_to_usdt_binance
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .analyzer import get_stars_rate, stars_to_ton_fragment, ton_to_usdt_binance, parse_fragment_transactions
+    from .session import create_session
+    from .prices import get_ton_usdt_price, PriceAggregator, register_price_source
+    from .cache import RateCache
+    from .diskcache import DiskCache
+    from .convert import StarsConverter
+    from .store import TransactionStore
+    from .ratelimit import configure_rate_limit, get_rate_limit_stats
 
 __version__ = "1.0.0"
-__all__ = ["get_stars_rate", "stars_to_ton_fragment", "ton_to_usdt_binance"]
\ No newline at end of file
+__all__ = ["get_stars_rate", "stars_to_ton_fragment", "ton_to_usdt_binance", "parse_fragment_transactions",
+           "create_session", "get_ton_usdt_price", "PriceAggregator", "register_price_source", "RateCache", "DiskCache", "StarsConverter", "TransactionStore",
+           "configure_rate_limit", "get_rate_limit_stats"]
+
+# Public name -> submodule; submodules are imported on first attribute access (PEP 562)
+_EXPORTS = {
+    "get_stars_rate": "analyzer",
+    "stars_to_ton_fragment": "analyzer",
+    "ton_to_usdt_binance": "analyzer",
+    "parse_fragment_transactions": "analyzer",
+    "create_session": "session",
+    "get_ton_usdt_price": "prices",
+    "PriceAggregator": "prices",
+    "register_price_source": "prices",
+    "RateCache": "cache",
+    "DiskCache": "diskcache",
+    "StarsConverter": "convert",
+    "TransactionStore": "store",
+    "configure_rate_limit": "ratelimit",
+    "get_rate_limit_stats": "ratelimit",
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
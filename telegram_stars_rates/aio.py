@@ -0,0 +1,319 @@
+"""
+⭐ Telegram Stars Rates - asyncio API
+
+Async counterparts of the public functions built on aiohttp
+(pip install telegram-stars-rates[async]). Results are identical to the
+blocking API: the TON → USDT leg runs the same hedged PriceAggregator, on a
+daemon thread, so both APIs share one source ranking.
+"""
+
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator, Mapping, Sequence, Tuple
+
+try:
+    import aiohttp
+except ImportError as e:
+    raise ImportError(
+        "telegram_stars_rates.aio requires aiohttp: pip install telegram-stars-rates[async]"
+    ) from e
+
+from . import analyzer, ratelimit
+from .analyzer import (
+    FRAGMENT_ADDRESS,
+    MAX_ADDRESS_WORKERS,
+    TONAPI_MAX_PAGE_SIZE,
+    Addresses,
+    RawSelection,
+    get_timestamp,
+    merge_events,
+    _address_list,
+    _binance_price,
+    _coingecko_price,
+    _combine_legs,
+    _events_request,
+    _is_past_window,
+    _next_cursor,
+    _parse_record,
+    _record_attempt,
+    _submit_daemon,
+    _summarize_transactions,
+    _timed_out_leg,
+    _validate_leg,
+    _with_raw_dicts,
+)
+from .estimators import EstimatorSpec
+from .outliers import HampelFilter, OutlierSpec
+from .prices import PriceAggregator, get_ton_usdt_price
+from .session import DEFAULT_HEADERS
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def create_async_session(pool_size: int = 10) -> aiohttp.ClientSession:
+    """Create an aiohttp session with a sized keep-alive connection pool.
+
+    Must be called from a running event loop; close it with `await session.close()`.
+    """
+    connector = aiohttp.TCPConnector(limit=pool_size, limit_per_host=pool_size)
+    return aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS)
+
+
+@asynccontextmanager
+async def _session_scope(session: Optional[aiohttp.ClientSession]) -> AsyncIterator[aiohttp.ClientSession]:
+    """Use the given session, or a temporary one closed on exit."""
+    if session is not None:
+        yield session
+        return
+    async with create_async_session() as own_session:
+        yield own_session
+
+
+async def _get_json(
+    session: aiohttp.ClientSession,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 10,
+    retries: int = 2,
+    backoff_factor: float = 0.3
+) -> Tuple[int, Mapping[str, str], Any]:
+    """GET a JSON document, retrying connection errors and 5xx like the sync session.
+
+    Returns (status, headers, data); data is None for non-2xx responses.
+    """
+    for attempt in range(retries + 1):
+        try:
+            async with session.get(
+                url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                if response.status in RETRY_STATUSES and attempt < retries:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status
+                    )
+                if response.status >= 400:
+                    return response.status, response.headers, None
+                return response.status, response.headers, await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt >= retries:
+                raise
+            await asyncio.sleep(backoff_factor * (2 ** attempt))
+
+
+async def async_ton_to_usdt_coingecko(session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
+    """Get TON → USDT exchange rate from CoinGecko API (backup)."""
+    async with _session_scope(session) as session:
+        try:
+            status, headers, data = await _get_json(
+                session, f"{analyzer.COINGECKO_URL}/api/v3/simple/price?ids=the-open-network&vs_currencies=usd"
+            )
+            if data is not None:
+                return _coingecko_price(data)
+        except:
+            pass
+    return {}
+
+
+async def async_ton_to_usdt_binance(session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
+    """Get TON → USDT exchange rate from Binance API."""
+    async with _session_scope(session) as session:
+        try:
+            status, headers, data = await _get_json(session, f"{analyzer.BINANCE_URL}/api/v3/ticker/price?symbol=TONUSDT")
+            if data is not None and (result := _binance_price(data)):
+                return result
+        except:
+            pass
+
+        # Fallback to CoinGecko if Binance fails
+        return await async_ton_to_usdt_coingecko(session)
+
+
+async def async_get_fragment_events_page(
+    limit: int = 50,
+    fragment_address: str = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    before_lt: Optional[int] = None,
+    session: Optional[aiohttp.ClientSession] = None
+) -> Dict[str, Any]:
+    """Get one page of Fragment account events via TON API."""
+    limiter = ratelimit.get_limiter(api_key, rate_limit_delay)
+    url, params, headers = _events_request(limit, fragment_address, api_key, before_lt)
+
+    async with _session_scope(session) as session:
+        for attempt in range(ratelimit.MAX_ATTEMPTS):
+            wait = limiter.reserve()
+            if wait:
+                await asyncio.sleep(wait)
+            status, response_headers, data = await _get_json(session, url, params=params, headers=headers, timeout=30)
+            _record_attempt(status, response_headers, attempt, wait, limiter)
+            if status != 429:
+                break
+
+        if data is None:
+            raise Exception(f"TON API error: HTTP {status}")
+        return data
+
+
+async def async_iter_fragment_events(
+    limit: Optional[int] = 50,
+    fragment_address: str = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    before_lt: Optional[int] = None,
+    page_size: int = TONAPI_MAX_PAGE_SIZE,
+    session: Optional[aiohttp.ClientSession] = None,
+    after_lt: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream Fragment account events newest first, following the next_from cursor."""
+    page_size = max(1, min(page_size, TONAPI_MAX_PAGE_SIZE))
+    count = 0
+
+    async with _session_scope(session) as session:
+        while limit is None or count < limit:
+            page_limit = page_size if limit is None else min(page_size, limit - count)
+            page = await async_get_fragment_events_page(
+                page_limit, fragment_address, rate_limit_delay, api_key, before_lt, session
+            )
+
+            for event in page.get("events", []):
+                if _is_past_window(event, since, after_lt):
+                    return
+                yield event
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+            before_lt = _next_cursor(page, before_lt)
+            if before_lt is None:
+                return
+
+
+async def async_get_fragment_events(
+    limit: int = 50,
+    fragment_address: str = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    session: Optional[aiohttp.ClientSession] = None
+) -> List[Dict[str, Any]]:
+    """Get Fragment account events via TON API, paginating past one page if needed."""
+    return [
+        event async for event in async_iter_fragment_events(
+            limit, fragment_address, rate_limit_delay, api_key, since, session=session
+        )
+    ]
+
+
+async def async_stars_to_ton_fragment(
+    limit: Optional[int] = 50,
+    fragment_address: Addresses = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    estimator: EstimatorSpec = "mean",
+    max_workers: int = MAX_ADDRESS_WORKERS,
+    outlier_filter: OutlierSpec = HampelFilter
+) -> Dict[str, Any]:
+    """Get current Stars → TON exchange rates via Fragment.
+
+    `fragment_address` may also be a list: up to `max_workers` addresses are
+    fetched at a time, then merged newest first and deduplicated before
+    `limit` applies, as in stars_to_ton_fragment().
+    """
+    return _with_raw_dicts(await _fragment_records(
+        limit, fragment_address, rate_limit_delay, api_key, since, session, estimator, max_workers, outlier_filter
+    ))
+
+
+async def _fragment_records(
+    limit: Optional[int] = 50,
+    fragment_address: Addresses = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    estimator: EstimatorSpec = "mean",
+    max_workers: int = MAX_ADDRESS_WORKERS,
+    outlier_filter: OutlierSpec = HampelFilter
+) -> Dict[str, Any]:
+    """async_stars_to_ton_fragment() with raw_transactions kept as Transaction records."""
+    addresses = _address_list(fragment_address)
+    async with _session_scope(session) as session:
+        if len(addresses) == 1:
+            events = [
+                event async for event in async_iter_fragment_events(
+                    limit, addresses[0], rate_limit_delay, api_key, since, session=session
+                )
+            ]
+        else:
+            slots = asyncio.Semaphore(max(1, max_workers))
+
+            async def fetch(address: str) -> List[Dict[str, Any]]:
+                async with slots:
+                    return await async_get_fragment_events(limit, address, rate_limit_delay, api_key, since, session)
+
+            per_address = await asyncio.gather(*(fetch(address) for address in addresses))
+            events = merge_events(per_address, limit)
+
+    stars_txs = [tx for event in events if (tx := _parse_record(event))]
+    return _summarize_transactions(stars_txs, estimator, outlier_filter)
+
+
+async def _fragment_leg(limit: int, session: aiohttp.ClientSession, kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], float, List[str]]:
+    """Fetch the Stars → TON leg."""
+    try:
+        data = await _fragment_records(limit=limit, session=session, **kwargs)
+    except Exception as e:
+        return {}, -1, [f"Fragment error: {e}"]
+    return _validate_leg(data, "ton_per_star", "Stars→TON")
+
+
+async def _ton_usdt_leg(price_aggregator: Optional[PriceAggregator]) -> Tuple[Dict[str, Any], float, List[str]]:
+    """Fetch the TON → USDT leg with the same hedged aggregator as the blocking API."""
+    try:
+        # The price sources are blocking fetchers; a daemon thread keeps a leg
+        # abandoned at the deadline from holding up the loop or interpreter exit
+        future = _submit_daemon(contextvars.copy_context().run, get_ton_usdt_price, None, price_aggregator, name="ton-price")
+        data = await asyncio.wrap_future(future)
+    except Exception as e:
+        return {}, -1, [f"TON→USDT error: {e}"]
+    return _validate_leg(data, "usdt_per_ton", "TON→USDT")
+
+
+async def async_get_stars_rate(
+    limit: int = 50,
+    include_raw: bool = False,
+    session: Optional[aiohttp.ClientSession] = None,
+    timeout: Optional[float] = None,
+    raw_fields: Optional[Sequence[str]] = None,
+    raw_offset: int = 0,
+    raw_limit: Optional[int] = None,
+    price_aggregator: Optional[PriceAggregator] = None,
+    **kwargs
+) -> Dict[str, Any]:
+    """Get complete Stars → TON → USDT exchange rate.
+
+    Both legs run concurrently; `timeout` is an overall deadline in seconds
+    after which a missing leg is reported as an error. The raw_* options
+    select the raw payload and `price_aggregator` the TON → USDT sources,
+    as in get_stars_rate().
+    """
+    timestamp = get_timestamp()
+
+    async with _session_scope(session) as session:
+        fragment_task = asyncio.ensure_future(_fragment_leg(limit, session, kwargs))
+        ton_usdt_task = asyncio.ensure_future(_ton_usdt_leg(price_aggregator))
+        done, pending = await asyncio.wait({fragment_task, ton_usdt_task}, timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    fragment_leg = fragment_task.result() if fragment_task in done else _timed_out_leg("Fragment", timeout)
+    ton_usdt_leg = ton_usdt_task.result() if ton_usdt_task in done else _timed_out_leg("TON→USDT", timeout)
+    raw = RawSelection(raw_fields, raw_offset, raw_limit) if include_raw else None
+    return _combine_legs(fragment_leg, ton_usdt_leg, timestamp, raw)
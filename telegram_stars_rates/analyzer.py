@@ -4,179 +4,688 @@
 Real-time Telegram Stars to USDT exchange rates via Fragment blockchain
 """
 
-import requests
+import contextvars
+import heapq
 import time
 import re
+import threading
+from array import array
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timezone
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, NamedTuple, Sequence, Tuple, TypeVar, Union, TYPE_CHECKING
+
+from .session import get_session
+from . import metrics, ratelimit
+from .estimators import EstimatorSpec, create_estimator
+from .metrics import Trace
+from .outliers import HampelFilter, OutlierSpec, is_plausible
+from .window import WINDOW_ESTIMATORS, RollingWindow
+from .stats import summarize_rates
+
+if TYPE_CHECKING:
+    import requests
+    from .cache import RateCache
+    from .prices import PriceAggregator
+    from .store import TransactionStore
+
+TONAPI_URL = "https://tonapi.io"
+BINANCE_URL = "https://api.binance.com"
+COINGECKO_URL = "https://api.coingecko.com"
+FRAGMENT_ADDRESS = "EQCFJEP4WZ_mpdo0_kMEmsTgvrMHG7K_tWY16pQhKHwoOoy2"
+TONAPI_MAX_PAGE_SIZE = 100
+MAX_ADDRESS_WORKERS = 4
+
+Addresses = Union[str, Sequence[str]]
+T = TypeVar("T")
 
 def get_timestamp() -> str:
     """Get current UTC timestamp in ISO format."""
     return datetime.now(timezone.utc).isoformat()
 
-def ton_to_usdt_coingecko() -> Dict[str, Any]:
+def _coingecko_price(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the TON → USDT result from a CoinGecko simple price response."""
+    if "the-open-network" in data and "usd" in data["the-open-network"]:
+        price = float(data["the-open-network"]["usd"])
+        if price > 0:
+            return {
+                "usdt_per_ton": price,
+                "last_updated": get_timestamp(),
+                "source": "coingecko"
+            }
+    return {}
+
+def _binance_price(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the TON → USDT result from a Binance ticker response."""
+    if "price" in data and float(data["price"]) > 0:
+        return {
+            "usdt_per_ton": float(data["price"]),
+            "last_updated": get_timestamp(),
+            "source": "binance"
+        }
+    return {}
+
+def ton_to_usdt_coingecko(session: Optional["requests.Session"] = None) -> Dict[str, Any]:
     """Get TON → USDT exchange rate from CoinGecko API (backup)."""
+    session = session or get_session()
     try:
-        response = requests.get(
-            "https://api.coingecko.com/api/v3/simple/price?ids=the-open-network&vs_currencies=usd",
-            timeout=10,
-            headers={'User-Agent': 'telegram-stars-rates/1.0'}
+        response = session.get(
+            f"{COINGECKO_URL}/api/v3/simple/price?ids=the-open-network&vs_currencies=usd",
+            timeout=10
         )
         response.raise_for_status()
-        data = response.json()
-        
-        if "the-open-network" in data and "usd" in data["the-open-network"]:
-            price = float(data["the-open-network"]["usd"])
-            if price > 0:
-                return {
-                    "usdt_per_ton": price,
-                    "last_updated": get_timestamp(),
-                    "source": "coingecko"
-                }
+        return _coingecko_price(response.json())
     except:
         pass
     return {}
 
-def ton_to_usdt_binance() -> Dict[str, Any]:
+def ton_to_usdt_binance(session: Optional["requests.Session"] = None) -> Dict[str, Any]:
     """Get TON → USDT exchange rate from Binance API."""
+    session = session or get_session()
     try:
-        response = requests.get(
-            "https://api.binance.com/api/v3/ticker/price?symbol=TONUSDT",
-            timeout=10,
-            headers={'User-Agent': 'telegram-stars-rates/1.0'}
+        response = session.get(
+            f"{BINANCE_URL}/api/v3/ticker/price?symbol=TONUSDT",
+            timeout=10
         )
         response.raise_for_status()
-        data = response.json()
-        
-        if "price" in data and float(data["price"]) > 0:
-            return {
-                "usdt_per_ton": float(data["price"]),
-                "last_updated": get_timestamp(),
-                "source": "binance"
-            }
+        if result := _binance_price(response.json()):
+            return result
     except:
         pass
     
     # Fallback to CoinGecko if Binance fails
-    return ton_to_usdt_coingecko()
+    return ton_to_usdt_coingecko(session)
 
-def parse_fragment_transaction(transaction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Parse Fragment Stars → TON transaction."""
+# "<N> Telegram Stars", normally followed by whitespace and "Ref#<id>"
+STARS_COMMENT_RE = re.compile(r'(\d+)\s+Telegram\s+Stars\s*(?:Ref#(\w+))?')
+REFERENCE_RE = re.compile(r'Ref#(\w+)')
+
+class Transaction(NamedTuple):
+    """A parsed Fragment Stars purchase, as kept internally.
+    
+    A plain tuple, so legs, caches and stores hold a fraction of the memory
+    of dicts; tx["stars"] and tx.get("hash") read it like one. The public
+    functions return as_dict() views of it.
+    """
+    timestamp: int
+    stars: int
+    ton: float
+    rate_per_star: float
+    reference: str
+    hash: str
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, _FIELD_INDEX[key])
+        return tuple.__getitem__(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        index = _FIELD_INDEX.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+    
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+    
+    def as_dict(self, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Dict view of the record, optionally restricted to `fields`."""
+        if fields is None:
+            return dict(zip(self._fields, self))
+        return {name: self[name] for name in fields}
+
+TRANSACTION_FIELDS = Transaction._fields
+_FIELD_INDEX = {name: index for index, name in enumerate(TRANSACTION_FIELDS)}
+
+class RawSelection(NamedTuple):
+    """Which part of raw_transactions get_stars_rate(include_raw=True) returns."""
+    fields: Optional[Sequence[str]] = None
+    offset: int = 0
+    limit: Optional[int] = None
+
+def _parse_transfer(transaction: Dict[str, Any]) -> Optional[Tuple[int, int, float, float, str, str]]:
+    """Parse a Fragment Stars → TON transaction into a TRANSACTION_FIELDS tuple."""
     try:
-        for action in transaction.get("actions", []):
-            if action.get("type") == "TonTransfer":
-                transfer = action.get("TonTransfer", {})
-                comment = transfer.get("comment", "")
-                
-                stars_match = re.search(r'(\d+)\s+Telegram\s+Stars', comment)
-                if not stars_match:
-                    continue
-                
-                stars = int(stars_match.group(1))
-                ton_amount = int(transfer.get("amount", 0)) / 1_000_000_000
-                
-                if stars > 0 and ton_amount > 0:
-                    ref_match = re.search(r'Ref#(\w+)', comment)
-                    return {
-                        "timestamp": transaction.get("timestamp", 0),
-                        "stars": stars,
-                        "ton": ton_amount,
-                        "rate_per_star": ton_amount / stars,
-                        "reference": ref_match.group(1) if ref_match else "Unknown",
-                        "hash": transaction.get("event_id", "")
-                    }
-    except:
+        for action in transaction.get("actions", ()):
+            if action.get("type") != "TonTransfer":
+                continue
+            transfer = action.get("TonTransfer", {})
+            comment = transfer.get("comment", "")
+            
+            match = STARS_COMMENT_RE.search(comment)
+            if not match:
+                continue
+            
+            stars_text, reference = match.groups()
+            stars = int(stars_text)
+            ton_amount = int(transfer.get("amount", 0)) / 1_000_000_000
+            
+            if stars > 0 and ton_amount > 0:
+                # Ref# elsewhere in the comment: the first one wins, as before
+                if reference is None or comment.find("Ref#", 0, match.start()) != -1:
+                    ref_match = REFERENCE_RE.search(comment)
+                    reference = ref_match.group(1) if ref_match else "Unknown"
+                return (
+                    transaction.get("timestamp", 0),
+                    stars,
+                    ton_amount,
+                    ton_amount / stars,
+                    reference,
+                    transaction.get("event_id", "")
+                )
+    except (AttributeError, TypeError, ValueError):
         pass
     return None
 
-def get_fragment_events(
-    limit: int = 50,
-    fragment_address: str = "EQCFJEP4WZ_mpdo0_kMEmsTgvrMHG7K_tWY16pQhKHwoOoy2",
-    rate_limit_delay: float = 2.0,
-    api_key: Optional[str] = None
-) -> List[Dict[str, Any]]:
-    """Get Fragment account events via TON API."""
-    if not api_key:
-        time.sleep(rate_limit_delay)
+def parse_fragment_transaction(transaction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Parse Fragment Stars → TON transaction."""
+    parsed = _parse_transfer(transaction)
+    if parsed is None:
+        return None
+    return dict(zip(TRANSACTION_FIELDS, parsed))
+
+def _parse_record(transaction: Dict[str, Any]) -> Optional[Transaction]:
+    """parse_fragment_transaction() as a Transaction record."""
+    parsed = _parse_transfer(transaction)
+    if parsed is None:
+        return None
+    return Transaction._make(parsed)
+
+def raw_transactions_view(stars_txs: Sequence[Transaction], raw: RawSelection = RawSelection()) -> List[Dict[str, Any]]:
+    """Dicts for one page of transaction records, with only the selected fields."""
+    fields = TRANSACTION_FIELDS if raw.fields is None else tuple(raw.fields)
+    unknown = set(fields) - set(TRANSACTION_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown transaction fields {sorted(unknown)}, expected any of: {', '.join(TRANSACTION_FIELDS)}")
+    
+    end = None if raw.limit is None else raw.offset + raw.limit
+    indices = [_FIELD_INDEX[name] for name in fields]
+    return [
+        {name: row[index] for name, index in zip(fields, indices)}
+        for row in stars_txs[raw.offset:end]
+    ]
+
+def parse_fragment_transactions(events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Parse many events in one pass into columns keyed by TRANSACTION_FIELDS.
+    
+    Numeric columns are compact arrays ('q' for timestamp/stars, 'd' for
+    ton/rate_per_star); reference and hash are lists of strings.
+    """
+    rows = [parsed for parsed in map(_parse_transfer, events) if parsed]
+    timestamps, stars, ton, rates, references, hashes = zip(*rows) if rows else ((),) * 6
     
-    headers = {"User-Agent": "telegram-stars-rates/1.0"}
+    return {
+        "timestamp": array("q", timestamps),
+        "stars": array("q", stars),
+        "ton": array("d", ton),
+        "rate_per_star": array("d", rates),
+        "reference": list(references),
+        "hash": list(hashes)
+    }
+
+def _events_request(
+    limit: int,
+    fragment_address: str,
+    api_key: Optional[str],
+    before_lt: Optional[int],
+    until: Optional[int] = None
+) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+    """Build url, params and headers for a tonapi events page request."""
+    headers = {}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
     
-    response = requests.get(
-        f"https://tonapi.io/v2/accounts/{fragment_address}/events",
-        params={"limit": limit},
-        headers=headers,
-        timeout=30
+    params = {"limit": limit}
+    if before_lt:
+        params["before_lt"] = before_lt
+    if until is not None:
+        params["end_date"] = until
+    
+    return f"{TONAPI_URL}/v2/accounts/{fragment_address}/events", params, headers
+
+def _next_cursor(page: Dict[str, Any], before_lt: Optional[int]) -> Optional[int]:
+    """Get the before_lt cursor for the next page, or None at the end of history."""
+    next_from = page.get("next_from")
+    if not page.get("events") or not next_from or next_from == before_lt:
+        return None
+    return next_from
+
+def _is_past_window(event: Dict[str, Any], since: Optional[int], after_lt: Optional[int]) -> bool:
+    """Check whether a newest-first event stream has gone past the requested window."""
+    if since is not None and event.get("timestamp", 0) < since:
+        return True
+    return after_lt is not None and event.get("lt", 0) <= after_lt
+
+def _record_attempt(status: int, headers: Dict[str, str], attempt: int, waited: float, limiter: ratelimit.TokenBucket):
+    """Update counters for a tonapi attempt and hold the bucket after a 429."""
+    throttled = status == 429
+    ratelimit.stats.record(
+        requests=1,
+        throttled=int(throttled),
+        retried=int(throttled and attempt + 1 < ratelimit.MAX_ATTEMPTS),
+        waited=waited
     )
+    if throttled:
+        limiter.penalize(ratelimit.backoff_delay(attempt, headers.get("Retry-After")))
+    if metrics.current_trace() is not None:
+        metrics.add_time("rate_limit_wait", waited)
+        metrics.count("tonapi_requests")
+        metrics.count("tonapi_throttled", int(throttled))
+
+def get_fragment_events_page(
+    limit: int = 50,
+    fragment_address: str = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    before_lt: Optional[int] = None,
+    session: Optional["requests.Session"] = None,
+    until: Optional[int] = None
+) -> Dict[str, Any]:
+    """Get one page of Fragment account events via TON API.
+    
+    Requests share a token bucket per API key (keyless ones are spaced
+    `rate_limit_delay` seconds apart); HTTP 429 is retried with jittered
+    exponential backoff honoring Retry-After, up to ratelimit.MAX_ATTEMPTS.
+    """
+    session = session or get_session()
+    limiter = ratelimit.get_limiter(api_key, rate_limit_delay)
+    url, params, headers = _events_request(limit, fragment_address, api_key, before_lt, until)
     
-    if response.status_code == 429:
-        time.sleep(7)
-        return get_fragment_events(limit, fragment_address, rate_limit_delay, api_key)
+    for attempt in range(ratelimit.MAX_ATTEMPTS):
+        wait = limiter.reserve()
+        if wait:
+            time.sleep(wait)
+        with metrics.stage("tonapi_request"):
+            response = session.get(url, params=params, headers=headers, timeout=30)
+        _record_attempt(response.status_code, response.headers, attempt, wait, limiter)
+        if response.status_code != 429:
+            break
     
     response.raise_for_status()
-    return response.json().get("events", [])
+    metrics.count("bytes_received", len(response.content))
+    with metrics.stage("json_decode"):
+        return response.json()
 
-def stars_to_ton_fragment(
+def iter_fragment_events(
+    limit: Optional[int] = 50,
+    fragment_address: str = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    before_lt: Optional[int] = None,
+    page_size: int = TONAPI_MAX_PAGE_SIZE,
+    session: Optional["requests.Session"] = None,
+    after_lt: Optional[int] = None,
+    until: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Stream Fragment account events newest first, following the next_from cursor.
+    
+    Starts at the `until` unix timestamp when given (otherwise at the newest
+    event) and stops after `limit` events (None for no limit), at the first
+    event older than the `since` unix timestamp or not newer than the
+    `after_lt` logical time, or when the account history is exhausted.
+    """
+    page_size = max(1, min(page_size, TONAPI_MAX_PAGE_SIZE))
+    count = 0
+    
+    while limit is None or count < limit:
+        page_limit = page_size if limit is None else min(page_size, limit - count)
+        page = get_fragment_events_page(page_limit, fragment_address, rate_limit_delay, api_key, before_lt, session, until)
+        events = page.get("events", [])
+        
+        for event in events:
+            if _is_past_window(event, since, after_lt):
+                return
+            yield event
+            count += 1
+            if limit is not None and count >= limit:
+                return
+        
+        before_lt = _next_cursor(page, before_lt)
+        if before_lt is None:
+            return
+
+def get_fragment_events(
     limit: int = 50,
-    fragment_address: str = "EQCFJEP4WZ_mpdo0_kMEmsTgvrMHG7K_tWY16pQhKHwoOoy2",
+    fragment_address: str = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    session: Optional["requests.Session"] = None
+) -> List[Dict[str, Any]]:
+    """Get Fragment account events via TON API, paginating past one page if needed."""
+    return list(iter_fragment_events(limit, fragment_address, rate_limit_delay, api_key, since, session=session))
+
+def merge_events(
+    streams: Iterable[Iterable[Dict[str, Any]]],
+    limit: Optional[int] = None,
+    id_key: str = "event_id"
+) -> Iterator[Dict[str, Any]]:
+    """K-way merge newest-first streams by timestamp, skipping ids already seen.
+    
+    An event touching several monitored addresses shows up under each of
+    them; only its first occurrence is kept. Stops after `limit` items.
+    """
+    seen = set()
+    count = 0
+    for item in heapq.merge(*streams, key=lambda item: item.get("timestamp", 0), reverse=True):
+        item_id = item.get(id_key)
+        if item_id:
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+        yield item
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+def _address_list(fragment_address: Addresses) -> List[str]:
+    """One address or a sequence of them, as a list without repeats."""
+    if isinstance(fragment_address, str):
+        return [fragment_address]
+    return list(dict.fromkeys(fragment_address))
+
+def _map_addresses(func: Callable[[str], T], addresses: List[str], max_workers: int) -> List[T]:
+    """Run func for every address on at most max_workers threads, returning results in address order."""
+    if len(addresses) == 1:
+        return [func(addresses[0])]
+    
+    slots = threading.BoundedSemaphore(max(1, min(max_workers, len(addresses))))
+    def run(address: str) -> T:
+        with slots:
+            return func(address)
+    
+    # Each task runs in a copy of the caller's context so metrics reach its trace
+    futures = [_submit_daemon(contextvars.copy_context().run, run, address, name="stars-rate-address") for address in addresses]
+    return [future.result() for future in futures]
+
+def _submit_daemon(func: Callable[..., T], *args, name: str = "stars-rate") -> Future:
+    """Run func(*args) on a daemon thread and return its Future.
+    
+    Unlike ThreadPoolExecutor workers, daemon threads are not joined at
+    interpreter exit, so a call abandoned at its deadline never delays exit.
+    """
+    future: Future = Future()
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, daemon=True, name=name).start()
+    return future
+
+def stars_to_ton_fragment(
+    limit: Optional[int] = 50,
+    fragment_address: Addresses = FRAGMENT_ADDRESS,
     rate_limit_delay: float = 2.0,
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    session: Optional["requests.Session"] = None,
+    store: Optional["TransactionStore"] = None,
+    estimator: EstimatorSpec = "mean",
+    max_workers: int = MAX_ADDRESS_WORKERS,
+    outlier_filter: OutlierSpec = HampelFilter,
+    window: Optional[Union[float, RollingWindow]] = None
 ) -> Dict[str, Any]:
-    """Get current Stars → TON exchange rates via Fragment."""
-    events = get_fragment_events(limit, fragment_address, rate_limit_delay, api_key)
+    """Get current Stars → TON exchange rates via Fragment.
+    
+    Events are streamed page by page, so `limit` may exceed a single API page;
+    pass `since` (unix timestamp) to analyze a time window instead. With a
+    TransactionStore only events newer than the stored ones are fetched and
+    the last `limit` stored Stars transactions are analyzed. `estimator`
+    selects how ton_per_star is derived (see estimators.ESTIMATORS).
+    Rates outside (0, 1] TON per Star are always dropped; `outlier_filter`
+    builds the filter that then drops bad or test transactions before any
+    statistics (a HampelFilter by default, None to skip it).
+    transactions_count and raw_transactions only cover the transactions
+    kept; outliers_count counts the rejected ones next to them.
+    
+    `fragment_address` may also be a list: the addresses are fetched on up to
+    `max_workers` threads drawing on the API key's shared rate limit, then
+    merged newest first and deduplicated before `limit` applies.
+    
+    `window` analyzes the transactions of the last `window` seconds instead
+    of the last `limit`. Pass a RollingWindow kept across calls to fetch
+    only newer transactions and update its statistics incrementally; new
+    transactions then go through the window's own outlier filter, and
+    outliers_count counts the rejected ones still inside the window.
+    
+    """
+    return _with_raw_dicts(_fragment_records(
+        limit, fragment_address, rate_limit_delay, api_key, since, session, store,
+        estimator, max_workers, outlier_filter, window
+    ))
+
+def _fragment_records(
+    limit: Optional[int] = 50,
+    fragment_address: Addresses = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    since: Optional[int] = None,
+    session: Optional["requests.Session"] = None,
+    store: Optional["TransactionStore"] = None,
+    estimator: EstimatorSpec = "mean",
+    max_workers: int = MAX_ADDRESS_WORKERS,
+    outlier_filter: OutlierSpec = HampelFilter,
+    window: Optional[Union[float, RollingWindow]] = None
+) -> Dict[str, Any]:
+    """stars_to_ton_fragment() with raw_transactions kept as Transaction records, for legs and caches."""
+    if window is None:
+        stars_txs = _fetch_transactions(
+            limit, _address_list(fragment_address), rate_limit_delay, api_key, since, session, store, max_workers
+        )
+        return _summarize_transactions(stars_txs, estimator, outlier_filter)
+    
+    rolling = window if isinstance(window, RollingWindow) else RollingWindow(window, outlier_filter=outlier_filter)
+    if estimator not in WINDOW_ESTIMATORS:
+        # Created before fetching, so it is fed the new transactions as they are added
+        rolling.estimator(estimator)
+    stars_txs = _fetch_transactions(
+        None, _address_list(fragment_address), rate_limit_delay, api_key, rolling.since(), session, store, max_workers
+    )
+    return _summarize_window(rolling, stars_txs, estimator)
+
+def _fetch_transactions(
+    limit: Optional[int],
+    addresses: List[str],
+    rate_limit_delay: float,
+    api_key: Optional[str],
+    since: Optional[int],
+    session: Optional["requests.Session"],
+    store: Optional["TransactionStore"],
+    max_workers: int
+) -> List[Dict[str, Any]]:
+    """Parsed Stars transactions of every address, newest first."""
+    if store is not None:
+        def read_store(address: str) -> List[Dict[str, Any]]:
+            store.sync(address, rate_limit_delay, api_key, initial_limit=limit, since=since, session=session)
+            with metrics.stage("store_read"):
+                return store.records(address, limit=limit, since=since)
+        
+        per_address = _map_addresses(read_store, addresses, max_workers)
+        return per_address[0] if len(per_address) == 1 else list(merge_events(per_address, limit, id_key="hash"))
+    
+    if len(addresses) == 1:
+        events = iter_fragment_events(limit, addresses[0], rate_limit_delay, api_key, since, session=session)
+    else:
+        fetch = lambda address: list(iter_fragment_events(limit, address, rate_limit_delay, api_key, since, session=session))
+        events = merge_events(_map_addresses(fetch, addresses, max_workers), limit)
+    return _parse_events(events)
+
+def _parse_events(events: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Parse a stream of events, timing only the parsing when metrics are on."""
+    trace = metrics.current_trace()
+    if trace is None:
+        return [tx for event in events if (tx := _parse_record(event))]
     
     stars_txs = []
+    elapsed = 0.0
     for event in events:
-        if result := parse_fragment_transaction(event):
+        start = time.perf_counter()
+        if result := _parse_record(event):
             stars_txs.append(result)
-    
+        elapsed += time.perf_counter() - start
+    trace.add_time("parse", elapsed)
+    return stars_txs
+
+def _summarize_transactions(
+    stars_txs: List[Dict[str, Any]],
+    estimator: EstimatorSpec = "mean",
+    outlier_filter: OutlierSpec = HampelFilter
+) -> Dict[str, Any]:
+    """Compute Stars → TON rate statistics from parsed transactions."""
     if not stars_txs:
         raise Exception("No Stars transactions found")
     
-    rates = [tx['rate_per_star'] for tx in stars_txs if 0 < tx['rate_per_star'] <= 1]
+    rate_estimator = create_estimator(estimator)
+    outliers = outlier_filter() if outlier_filter is not None else None
+    plausible = [tx for tx in stars_txs if is_plausible(tx['rate_per_star'])]
+    rates, stars, kept = array("d"), array("d"), []
+    for tx in outliers.filter(plausible) if outliers is not None else plausible:
+        rates.append(tx['rate_per_star'])
+        stars.append(tx['stars'])
+        rate_estimator.add_transaction(tx)
+        kept.append(tx)
     
     if not rates:
         raise Exception("No valid rates found")
     
+    with metrics.stage("summarize"):
+        stats = summarize_rates(rates, weights=stars)
+    return _rate_summary(
+        rate_estimator.value,
+        rate_estimator.name or type(rate_estimator).__name__,
+        stats,
+        kept,
+        len(stars_txs) - len(kept)
+    )
+
+def _summarize_window(rolling: RollingWindow, stars_txs: List[Dict[str, Any]], estimator: EstimatorSpec) -> Dict[str, Any]:
+    """Feed newly fetched transactions into a rolling window and read its statistics."""
+    now = rolling.clock()
+    # Fed oldest first, so evictions come off the front of the window
+    rolling.extend(reversed(stars_txs), now)
+    rolling.evict(now)
+    
+    if not len(rolling):
+        raise Exception("No Stars transactions found")
+    
+    with metrics.stage("summarize"):
+        stats = rolling.summary()
+    if estimator in WINDOW_ESTIMATORS:
+        ton_per_star, estimator_name = stats[estimator], estimator
+    else:
+        kept = rolling.estimator(estimator)
+        ton_per_star, estimator_name = kept.value, kept.name or type(kept).__name__
+    summary = _rate_summary(
+        ton_per_star,
+        estimator_name,
+        stats,
+        rolling.transactions(),
+        rolling.rejected_count
+    )
+    summary["window_seconds"] = rolling.seconds
+    return summary
+
+def _rate_summary(
+    ton_per_star: float,
+    estimator_name: str,
+    stats: Dict[str, Any],
+    stars_txs: List[Dict[str, Any]],
+    outliers_count: int
+) -> Dict[str, Any]:
+    """Build the Stars → TON leg result.
+    
+    `stars_txs` are the transactions the statistics were computed from, so
+    transactions_count and raw_transactions never include rejected ones;
+    outliers_count gives how many of the analyzed transactions were rejected.
+    """
     return {
-        "ton_per_star": sum(rates) / len(rates),
+        "ton_per_star": ton_per_star,
+        "estimator": estimator_name,
+        "mean_rate": stats["mean"],
         "transactions_count": len(stars_txs),
-        "min_rate": min(rates),
-        "max_rate": max(rates),
-        "median_rate": sorted(rates)[len(rates)//2],
+        "outliers_count": outliers_count,
+        "min_rate": stats["min"],
+        "max_rate": stats["max"],
+        "median_rate": stats["median"],
+        "trimmed_mean_rate": stats["trimmed_mean"],
+        "vwap_rate": stats["vwap"],
+        "stddev_rate": stats["stddev"],
+        "percentiles": stats["percentiles"],
         "timestamp": get_timestamp(),
         "raw_transactions": stars_txs
     }
 
-def get_stars_rate(limit: int = 50, include_raw: bool = False, **kwargs) -> Dict[str, Any]:
-    """Get complete Stars → TON → USDT exchange rate."""
-    errors = []
-    timestamp = get_timestamp()
-    
-    # Get Stars → TON rates
+def _with_raw_dicts(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a leg result with raw_transactions as dicts, as the public functions return it."""
+    return dict(result, raw_transactions=raw_transactions_view(result["raw_transactions"]))
+
+def _validate_leg(data: Dict[str, Any], key: str, pair: str) -> Tuple[Dict[str, Any], float, List[str]]:
+    """Check a leg's rate, returning (data, rate, errors) with -1 for invalid rates."""
+    rate = data.get(key, -1)
+    if rate <= 0:
+        return data, -1, [f"Invalid {pair} rate"]
+    return data, rate, []
+
+def _fragment_leg(
+    limit: int,
+    session: "requests.Session",
+    kwargs: Dict[str, Any],
+    cache: Optional["RateCache"] = None
+) -> Tuple[Dict[str, Any], float, List[str]]:
+    """Fetch the Stars → TON leg."""
+    fetch = cache._fragment if cache is not None else _fragment_records
     try:
-        stars_to_ton = stars_to_ton_fragment(limit=limit, **kwargs)
-        ton_per_star = stars_to_ton.get("ton_per_star", -1)
-        if ton_per_star <= 0:
-            errors.append("Invalid Stars→TON rate")
-            ton_per_star = -1
+        with metrics.stage("fragment"):
+            data = fetch(limit=limit, session=session, **kwargs)
     except Exception as e:
-        errors.append(f"Fragment error: {e}")
-        stars_to_ton = {}
-        ton_per_star = -1
-    
-    # Get TON → USDT rates
+        return {}, -1, [f"Fragment error: {e}"]
+    return _validate_leg(data, "ton_per_star", "Stars→TON")
+
+def _ton_usdt_leg(
+    session: "requests.Session",
+    cache: Optional["RateCache"] = None,
+    price_aggregator: Optional["PriceAggregator"] = None
+) -> Tuple[Dict[str, Any], float, List[str]]:
+    """Fetch the TON → USDT leg."""
+    # Imported here: prices builds on the fetchers defined in this module
+    from .prices import get_ton_usdt_price
     try:
-        ton_to_usdt = ton_to_usdt_binance()
-        usdt_per_ton = ton_to_usdt.get("usdt_per_ton", -1)
-        if usdt_per_ton <= 0:
-            errors.append("Invalid TON→USDT rate")
-            usdt_per_ton = -1
+        with metrics.stage("ton_usdt"):
+            if cache is not None:
+                data = cache.ton_usdt(session=session, price_aggregator=price_aggregator)
+            else:
+                data = get_ton_usdt_price(session, price_aggregator)
     except Exception as e:
-        errors.append(f"Binance error: {e}")
-        ton_to_usdt = {}
-        usdt_per_ton = -1
+        return {}, -1, [f"TON→USDT error: {e}"]
+    if (trace := metrics.current_trace()) is not None:
+        trace.source = data.get("source")
+    return _validate_leg(data, "usdt_per_ton", "TON→USDT")
+
+def _timed_out_leg(label: str, timeout: Optional[float]) -> Tuple[Dict[str, Any], float, List[str]]:
+    """Leg result for a leg that missed the overall deadline."""
+    metrics.count("timeouts")
+    return {}, -1, [f"{label} error: timed out after {timeout}s"]
+
+def _await_leg(future: Future, deadline: Optional[float], label: str, timeout: Optional[float]) -> Tuple[Dict[str, Any], float, List[str]]:
+    """Wait for a leg until the shared deadline."""
+    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+    try:
+        return future.result(timeout=remaining)
+    except FuturesTimeoutError:
+        return _timed_out_leg(label, timeout)
+
+def _combine_legs(
+    fragment_leg: Tuple[Dict[str, Any], float, List[str]],
+    ton_usdt_leg: Tuple[Dict[str, Any], float, List[str]],
+    timestamp: str,
+    raw: Optional[RawSelection]
+) -> Dict[str, Any]:
+    """Build the get_stars_rate result from both legs, with the raw legs when `raw` is given."""
+    stars_to_ton, ton_per_star, fragment_errors = fragment_leg
+    ton_to_usdt, usdt_per_ton, ton_usdt_errors = ton_usdt_leg
+    errors = fragment_errors + ton_usdt_errors
     
     # Calculate final rate
     if ton_per_star > 0 and usdt_per_ton > 0:
@@ -196,12 +705,99 @@ def get_stars_rate(limit: int = 50, include_raw: bool = False, **kwargs) -> Dict
         "errors": errors
     }
     
-    if include_raw:
-        result["fragment_raw"] = stars_to_ton
+    if raw is not None:
+        # The leg may be cached and shared: copy it rather than replace its records
+        result["fragment_raw"] = dict(stars_to_ton)
+        if "raw_transactions" in stars_to_ton:
+            result["fragment_raw"]["raw_transactions"] = raw_transactions_view(stars_to_ton["raw_transactions"], raw)
         result["binance_raw"] = ton_to_usdt
     
     return result
 
+def get_stars_rate(
+    limit: int = 50,
+    include_raw: bool = False,
+    session: Optional["requests.Session"] = None,
+    timeout: Optional[float] = None,
+    cache: Optional["RateCache"] = None,
+    price_aggregator: Optional["PriceAggregator"] = None,
+    include_metrics: bool = False,
+    raw_fields: Optional[Sequence[str]] = None,
+    raw_offset: int = 0,
+    raw_limit: Optional[int] = None,
+    **kwargs
+) -> Dict[str, Any]:
+    """Get complete Stars → TON → USDT exchange rate.
+    
+    The Fragment and TON/USDT legs are fetched concurrently; `timeout` is an
+    overall deadline in seconds after which a missing leg is reported as an error.
+    Pass a RateCache to serve both legs from memory while they are fresh.
+    TON → USDT comes from a hedged query over the registered price sources
+    (see prices.PriceAggregator). With include_metrics=True the per-stage
+    timings and counters (see metrics.Trace) are added under "metrics"; they
+    are also passed to hooks registered with metrics.add_hook().
+    
+    With include_raw=True the transaction records are returned as dicts
+    under fragment_raw.raw_transactions; `raw_fields` keeps only some
+    TRANSACTION_FIELDS and `raw_offset`/`raw_limit` return one page of them.
+    """
+    raw = RawSelection(raw_fields, raw_offset, raw_limit) if include_raw else None
+    if not include_metrics and not metrics.has_hooks():
+        return _get_stars_rate(limit, raw, session, timeout, cache, price_aggregator, kwargs)
+    
+    trace = Trace()
+    start = time.perf_counter()
+    with metrics.tracing(trace):
+        result = _get_stars_rate(limit, raw, session, timeout, cache, price_aggregator, kwargs)
+    trace.add_time("total", time.perf_counter() - start)
+    trace.count("errors", len(result["errors"]))
+    
+    if include_metrics:
+        result["metrics"] = trace.as_dict()
+    metrics.emit(trace)
+    return result
+
+def _get_stars_rate(
+    limit: int,
+    raw: Optional[RawSelection],
+    session: Optional["requests.Session"],
+    timeout: Optional[float],
+    cache: Optional["RateCache"],
+    price_aggregator: Optional["PriceAggregator"],
+    kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    session = session or get_session()
+    timestamp = get_timestamp()
+    
+    if cache is not None:
+        # Hot path: both legs cached, no threads involved
+        stars_to_ton = cache._fragment(block=False, limit=limit, session=session, **kwargs)
+        ton_to_usdt = cache.ton_usdt(block=False, session=session, price_aggregator=price_aggregator)
+        if stars_to_ton is not None and ton_to_usdt is not None:
+            if (trace := metrics.current_trace()) is not None:
+                trace.count("cache_hits", 2)
+                trace.source = ton_to_usdt.get("source")
+            return _combine_legs(
+                _validate_leg(stars_to_ton, "ton_per_star", "Stars→TON"),
+                _validate_leg(ton_to_usdt, "usdt_per_ton", "TON→USDT"),
+                timestamp,
+                raw
+            )
+    
+    deadline = None if timeout is None else time.monotonic() + timeout
+    
+    # Each leg runs in a copy of this context so it records into the current trace
+    fragment_future = _submit_daemon(
+        contextvars.copy_context().run, _fragment_leg, limit, session, kwargs, cache
+    )
+    ton_usdt_future = _submit_daemon(
+        contextvars.copy_context().run, _ton_usdt_leg, session, cache, price_aggregator
+    )
+    fragment_leg = _await_leg(fragment_future, deadline, "Fragment", timeout)
+    ton_usdt_leg = _await_leg(ton_usdt_future, deadline, "TON→USDT", timeout)
+    
+    return _combine_legs(fragment_leg, ton_usdt_leg, timestamp, raw)
+
 if __name__ == "__main__":
     import json
     result = get_stars_rate(include_raw=True)
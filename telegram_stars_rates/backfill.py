@@ -0,0 +1,206 @@
+"""
+⭐ Telegram Stars Rates - Historical backfill
+
+Walks Fragment events backwards over a date range, joins each Stars purchase
+with the hourly TON/USDT Binance kline it falls in, and groups them into
+OHLC + VWAP candles. Every stage is a generator, so only the current candle
+and one window of klines are held in memory whatever the range.
+"""
+
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Iterable, Iterator, TYPE_CHECKING
+
+from . import analyzer
+from .analyzer import FRAGMENT_ADDRESS, iter_fragment_events, _parse_record
+from .outliers import HampelFilter, OutlierSpec, is_plausible
+from .session import get_session
+
+if TYPE_CHECKING:
+    import requests
+
+INTERVALS = {"1h": 3600, "1d": 86400}
+KLINE_SECONDS = 3600
+KLINES_MAX_LIMIT = 1000
+
+
+class TonUsdtHistory:
+    """Hourly TON/USDT closes from Binance klines, fetched one window at a time.
+
+    Lookups are expected newest first, so each window ends at the requested
+    hour and reaches `window` hours back.
+    """
+
+    def __init__(self, session: Optional["requests.Session"] = None, window: int = KLINES_MAX_LIMIT):
+        self.session = session or get_session()
+        self.window = max(1, min(window, KLINES_MAX_LIMIT))
+        self._start: Optional[int] = None
+        self._closes = array("d")
+
+    def price_at(self, timestamp: int) -> float:
+        """TON/USDT close of the hour containing `timestamp`, or 0.0 if Binance has none."""
+        hour = timestamp - timestamp % KLINE_SECONDS
+        if self._start is None or not self._start <= hour < self._start + len(self._closes) * KLINE_SECONDS:
+            self._load(hour)
+        return self._closes[(hour - self._start) // KLINE_SECONDS]
+
+    def _load(self, hour: int):
+        start = hour - (self.window - 1) * KLINE_SECONDS
+        response = self.session.get(
+            f"{analyzer.BINANCE_URL}/api/v3/klines",
+            params={
+                "symbol": "TONUSDT",
+                "interval": "1h",
+                "startTime": start * 1000,
+                "endTime": (hour + KLINE_SECONDS) * 1000 - 1,
+                "limit": self.window
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+
+        closes = array("d", bytes(8 * self.window))
+        for row in response.json():
+            index = (row[0] // 1000 - start) // KLINE_SECONDS
+            if 0 <= index < self.window:
+                closes[index] = float(row[4])
+
+        # Carry the last close over hours without a kline
+        for i in range(1, self.window):
+            if not closes[i]:
+                closes[i] = closes[i - 1]
+
+        self._start = start
+        self._closes = closes
+
+
+class _OHLC:
+    """Open/high/low/close and volume-weighted average of a newest-first price stream."""
+    __slots__ = ("open", "high", "low", "close", "value", "volume")
+
+    def __init__(self):
+        self.open = self.high = self.low = self.close = None
+        self.value = 0.0
+        self.volume = 0.0
+
+    def add(self, price: float, volume: float):
+        if self.close is None:
+            self.close = self.high = self.low = price
+        self.open = price
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.value += price * volume
+        self.volume += volume
+
+    def as_dict(self) -> Optional[Dict[str, float]]:
+        if self.close is None:
+            return None
+        return {
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "vwap": self.value / self.volume
+        }
+
+
+class Candle:
+    """One interval of Stars purchases."""
+    __slots__ = ("start", "interval", "transactions", "stars", "ton", "usdt", "ton_per_star", "usdt_per_star")
+
+    def __init__(self, start: int, interval: str):
+        self.start = start
+        self.interval = interval
+        self.transactions = 0
+        self.stars = 0
+        self.ton = 0.0
+        self.usdt = 0.0
+        self.ton_per_star = _OHLC()
+        self.usdt_per_star = _OHLC()
+
+    def add(self, tx: Dict[str, Any], usdt_per_ton: float):
+        self.transactions += 1
+        self.stars += tx["stars"]
+        self.ton += tx["ton"]
+        self.ton_per_star.add(tx["rate_per_star"], tx["stars"])
+        # Purchases from before Binance listed TON only count towards the TON series
+        if usdt_per_ton > 0:
+            self.usdt += tx["ton"] * usdt_per_ton
+            self.usdt_per_star.add(tx["rate_per_star"] * usdt_per_ton, tx["stars"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "start": datetime.fromtimestamp(self.start, timezone.utc).isoformat(),
+            "timestamp": self.start,
+            "interval": self.interval,
+            "transactions": self.transactions,
+            "stars": self.stars,
+            "ton": self.ton,
+            "usdt_per_ton": self.usdt / self.ton if self.usdt else None,
+            "ton_per_star": self.ton_per_star.as_dict(),
+            "usdt_per_star": self.usdt_per_star.as_dict()
+        }
+
+
+def iter_candles(
+    transactions: Iterable[Dict[str, Any]],
+    interval: str = "1d",
+    prices: Optional[TonUsdtHistory] = None,
+    outlier_filter: OutlierSpec = HampelFilter
+) -> Iterator[Dict[str, Any]]:
+    """Group newest-first parsed transactions into candles, yielding each as soon as it is complete.
+
+    Candles come out newest first; intervals without purchases are skipped.
+    Without `prices` only the TON series is filled in. Rates outside
+    (0, 1] TON are dropped, then outliers with `outlier_filter` (None to
+    keep every plausible transaction).
+    """
+    seconds = INTERVALS[interval]
+    candle = None
+    transactions = (tx for tx in transactions if is_plausible(tx["rate_per_star"]))
+    if outlier_filter is not None:
+        transactions = outlier_filter().filter(transactions)
+
+    for tx in transactions:
+        start = tx["timestamp"] - tx["timestamp"] % seconds
+        # tonapi orders by logical time, so a purchase may be a few seconds
+        # newer than the previous one; keep it in the open candle
+        if candle is None or start < candle.start:
+            if candle is not None:
+                yield candle.as_dict()
+            candle = Candle(start, interval)
+        candle.add(tx, prices.price_at(tx["timestamp"]) if prices is not None else 0.0)
+
+    if candle is not None:
+        yield candle.as_dict()
+
+
+def backfill(
+    since: int,
+    until: Optional[int] = None,
+    interval: str = "1d",
+    fragment_address: str = FRAGMENT_ADDRESS,
+    rate_limit_delay: float = 2.0,
+    api_key: Optional[str] = None,
+    session: Optional["requests.Session"] = None
+) -> Iterator[Dict[str, Any]]:
+    """Stream Stars price candles between the `since` and `until` unix timestamps (default now), newest first."""
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval '{interval}', expected one of {', '.join(INTERVALS)}")
+    session = session or get_session()
+    until = until if until is not None else int(time.time())
+
+    events = iter_fragment_events(
+        None, fragment_address, rate_limit_delay, api_key, since, session=session, until=until
+    )
+    transactions = (tx for event in events if (tx := _parse_record(event)))
+    return iter_candles(transactions, interval, TonUsdtHistory(session))
+
+
+def parse_date(value: str) -> int:
+    """Unix timestamp of an ISO date or datetime, read as UTC when it has no offset."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
@@ -0,0 +1,189 @@
+"""
+⭐ Telegram Stars Rates - In-process rate cache
+
+TTL cache in front of the Fragment and TON/USDT legs with
+stale-while-revalidate background refresh and single-flight fetches,
+optionally shared between processes through a DiskCache backend.
+"""
+
+import threading
+import time
+from typing import Optional, Dict, Any, Callable, Hashable, Tuple
+
+from .analyzer import Transaction, get_stars_rate, _fragment_records, _with_raw_dicts
+from .diskcache import DiskCache
+from .prices import PriceAggregator, get_ton_usdt_price
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Dict[str, Any], fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class _Call:
+    """An in-flight fetch shared by every caller of the same key."""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class RateCache:
+    """Cache for get_stars_rate legs.
+
+    Fresh values are returned straight from memory. Once a value is older than
+    its TTL it is still served for up to `stale_ttl` more seconds while a single
+    background thread refreshes it. Concurrent misses for the same key share
+    one upstream fetch.
+
+    With a `backend` the values are shared between processes: a process with
+    nothing fresh in memory reads the backend first, and only one process per
+    TTL fetches upstream.
+
+    Usage:
+        cache = RateCache(fragment_ttl=300, ton_usdt_ttl=30)
+        result = cache.get_stars_rate()
+    """
+
+    def __init__(
+        self,
+        fragment_ttl: float = 300.0,
+        ton_usdt_ttl: float = 30.0,
+        stale_ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        backend: Optional[DiskCache] = None
+    ):
+        self.fragment_ttl = fragment_ttl
+        self.ton_usdt_ttl = ton_usdt_ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.backend = backend
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def fragment(self, block: bool = True, session=None, **kwargs) -> Optional[Dict[str, Any]]:
+        """Cached stars_to_ton_fragment(**kwargs).
+
+        With block=False returns None instead of fetching when nothing is cached.
+        """
+        value = self._fragment(block, session, **kwargs)
+        return _with_raw_dicts(value) if value is not None else None
+
+    def _fragment(self, block: bool = True, session=None, **kwargs) -> Optional[Dict[str, Any]]:
+        """The cached leg itself, with raw_transactions as Transaction records."""
+        key = ("fragment",) + _freeze(kwargs)
+        fetch = lambda: _fragment_records(session=session, **kwargs)
+        return self._get(key, fetch, self.fragment_ttl, block)
+
+    def ton_usdt(
+        self,
+        block: bool = True,
+        session=None,
+        price_aggregator: Optional[PriceAggregator] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Cached get_ton_usdt_price()."""
+        fetch = lambda: get_ton_usdt_price(session, price_aggregator)
+        return self._get(("ton_usdt",) + _aggregator_key(price_aggregator), fetch, self.ton_usdt_ttl, block)
+
+    def get_stars_rate(self, limit: int = 50, include_raw: bool = False, **kwargs) -> Dict[str, Any]:
+        """get_stars_rate served through this cache."""
+        return get_stars_rate(limit=limit, include_raw=include_raw, cache=self, **kwargs)
+
+    def clear(self):
+        """Drop every cached value."""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: Hashable, fetch: Callable[[], Dict[str, Any]], ttl: float, block: bool) -> Optional[Dict[str, Any]]:
+        now = self.clock()
+        entry = self._entries.get(key)
+        if self.backend is not None and (entry is None or now >= entry.fresh_until):
+            entry = self._from_backend(key, ttl, now) or entry
+        if entry is not None and now < entry.fresh_until:
+            return entry.value
+
+        if entry is not None and now < entry.stale_until:
+            call, leader = self._join(key)
+            if leader:
+                threading.Thread(
+                    target=self._fetch, args=(key, fetch, ttl, call), daemon=True, name="stars-rate-refresh"
+                ).start()
+            return entry.value
+
+        if not block:
+            return None
+
+        call, leader = self._join(key)
+        if leader:
+            self._fetch(key, fetch, ttl, call)
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def _join(self, key: Hashable) -> Tuple[_Call, bool]:
+        """Get the in-flight call for key, and whether the caller must run it."""
+        with self._lock:
+            call = self._inflight.get(key)
+            if call is not None:
+                return call, False
+            call = self._inflight[key] = _Call()
+            return call, True
+
+    def _from_backend(self, key: Hashable, ttl: float, now: float) -> Optional[_Entry]:
+        """Adopt a value another process stored, keeping its remaining lifetime."""
+        stored = self.backend.read(key)
+        if stored is None or stored[1] >= ttl + self.stale_ttl:
+            return None
+        value, age = stored
+        entry = self._entries[key] = _Entry(_restore(value), now + ttl - age, now + ttl + self.stale_ttl - age)
+        return entry
+
+    def _fetch(self, key: Hashable, fetch: Callable[[], Dict[str, Any]], ttl: float, call: _Call):
+        try:
+            if self.backend is not None:
+                value, age = self.backend.load(key, fetch, ttl)
+                value = _restore(value)
+            else:
+                value, age = fetch(), 0.0
+            # Failed price lookups come back empty; never cache them
+            if value:
+                now = self.clock() - age
+                self._entries[key] = _Entry(value, now + ttl, now + ttl + self.stale_ttl)
+            call.value = value
+        except Exception as e:
+            call.error = e
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+
+def _freeze(kwargs: Dict[str, Any]) -> Tuple:
+    """Turn keyword arguments into a hashable cache key."""
+    return tuple(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in sorted(kwargs.items())
+    )
+
+
+def _restore(value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Turn raw transaction rows read back from JSON into Transaction records again."""
+    if value and value.get("raw_transactions") and not isinstance(value["raw_transactions"][0], Transaction):
+        value = dict(value, raw_transactions=[Transaction._make(row) for row in value["raw_transactions"]])
+    return value
+
+
+def _aggregator_key(aggregator: Optional[PriceAggregator]) -> Tuple:
+    """Key aggregators by configuration, so separate processes share their prices."""
+    if aggregator is None:
+        return ()
+    return (aggregator.mode, tuple(aggregator.sources or ()))
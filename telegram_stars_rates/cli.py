@@ -6,7 +6,10 @@
 import sys
 import json
 import argparse
-from .analyzer import get_stars_rate
+from .estimators import ESTIMATORS
+
+# Everything else (and requests with it) is imported by the command that
+# needs it, so --help and argument errors return without loading it.
 
 
 def main():
@@ -16,18 +19,53 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
+    parser.add_argument(
+        "command", nargs="?", choices=["serve", "backfill"],
+        help="serve: run a local HTTP rate server; backfill: print historical OHLC candles"
+    )
     parser.add_argument("--limit", type=int, default=50, help="Number of transactions to analyze")
     parser.add_argument("--raw", action="store_true", help="Include raw data")
     parser.add_argument("--json", action="store_true", help="JSON output")
     parser.add_argument("--api-key", help="TON API key")
+    parser.add_argument("--timeout", type=float, help="Overall deadline in seconds")
+    parser.add_argument("--estimator", choices=list(ESTIMATORS), default="mean", help="Stars → TON rate estimator")
+    parser.add_argument("--window", type=float, metavar="SECONDS", help="Analyze the transactions of the last SECONDS instead of --limit")
+    parser.add_argument("--watch", type=float, metavar="INTERVAL", help="Keep running, print one JSON line every INTERVAL seconds")
+    parser.add_argument("--store", help="SQLite file for Fragment transactions in --watch/serve mode (default: in memory)")
+    parser.add_argument("--host", default="127.0.0.1", help="serve: bind address")
+    parser.add_argument("--port", type=int, default=8080, help="serve: port")
+    parser.add_argument("--refresh", type=float, default=60.0, help="serve: seconds between rate refreshes")
+    parser.add_argument("--history", metavar="FILE", help="serve: binary rate history file kept across restarts for /history.json")
+    parser.add_argument("--metrics", action="store_true", help="Include per-stage timings (serve: expose /metrics)")
+    parser.add_argument("--since", help="backfill: start date (ISO, UTC)")
+    parser.add_argument("--until", help="backfill: end date (ISO, UTC, default now)")
+    parser.add_argument("--interval", default="1d", help="backfill: candle size, 1h or 1d")
+    parser.add_argument("--record", metavar="FILE", help="Append the raw upstream responses to a gzipped NDJSON dump")
+    parser.add_argument("--replay", metavar="FILE", help="Answer upstream requests from a --record dump instead of the network")
+    parser.add_argument("--replay-speed", type=float, metavar="X", help="Replay with the recorded latencies divided by X (default: full speed)")
     
     args = parser.parse_args()
     
+    if args.command == "serve":
+        return serve(args)
+    if args.command == "backfill":
+        return backfill_history(args)
+    if args.watch:
+        return watch(args)
+    
+    from .analyzer import get_stars_rate
+    session, options = dump_session(args)
     try:
         result = get_stars_rate(
+            session=session,
+            **options,
             limit=args.limit,
             include_raw=args.raw,
-            api_key=args.api_key
+            api_key=args.api_key,
+            timeout=args.timeout,
+            estimator=args.estimator,
+            include_metrics=args.metrics,
+            window=args.window
         )
         
         if args.json:
@@ -49,6 +87,121 @@ def main():
     except Exception as e:
         print(f"❌ Error: {e}", file=sys.stderr)
         return 1
+    finally:
+        if session is not None:
+            session.close()
+
+
+def dump_session(args):
+    """Session for --record/--replay (None for the shared one) and the extra fetch options."""
+    if not (args.replay or args.record):
+        return None, {}
+    from .replay import RecordingSession, ReplaySession
+    if args.replay:
+        # Recorded responses need no client-side spacing
+        return ReplaySession(args.replay, speed=args.replay_speed), {"rate_limit_delay": 0}
+    return RecordingSession(args.record), {}
+
+
+def watch(args):
+    """Print NDJSON rate updates until interrupted."""
+    from .store import TransactionStore
+    from .watch import watch_rates
+    from .window import RollingWindow
+    store = TransactionStore(args.store) if args.store else TransactionStore()
+    # One window for the whole run, so each refresh only adds the new transactions
+    window = RollingWindow(args.window) if args.window else None
+    session, options = dump_session(args)
+    try:
+        for result in watch_rates(
+            args.watch,
+            limit=args.limit,
+            store=store,
+            session=session,
+            **options,
+            include_raw=args.raw,
+            api_key=args.api_key,
+            timeout=args.timeout,
+            estimator=args.estimator,
+            include_metrics=args.metrics,
+            window=window
+        ):
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head)
+        sys.stderr.close()
+    finally:
+        store.close()
+        if session is not None:
+            session.close()
+    return 0
+
+
+def backfill_history(args):
+    """Print NDJSON candles, newest first, for the --since/--until range."""
+    from .backfill import backfill, parse_date
+    if not args.since:
+        print("❌ Error: backfill needs --since", file=sys.stderr)
+        return 1
+    session, options = dump_session(args)
+    try:
+        for candle in backfill(
+            parse_date(args.since),
+            parse_date(args.until) if args.until else None,
+            interval=args.interval,
+            api_key=args.api_key,
+            session=session,
+            **options
+        ):
+            print(json.dumps(candle, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        sys.stderr.close()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if session is not None:
+            session.close()
+    return 0
+
+
+def serve(args):
+    """Run the local HTTP rate server until interrupted."""
+    from .history import HistoryStore
+    from .metrics import PrometheusExporter
+    from .server import RateServer
+    from .store import TransactionStore
+    session, options = dump_session(args)
+    server = RateServer(
+        host=args.host,
+        port=args.port,
+        refresh_interval=args.refresh,
+        limit=args.limit,
+        store=TransactionStore(args.store) if args.store else None,
+        exporter=PrometheusExporter() if args.metrics else None,
+        history_store=HistoryStore(args.history) if args.history else None,
+        api_key=args.api_key,
+        timeout=args.timeout,
+        estimator=args.estimator,
+        session=session,
+        **options
+    )
+    host, port = server.address
+    print(f"⭐ Serving http://{host}:{port}/api.json (refresh every {args.refresh:g}s)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.history_store is not None:
+            server.history_store.close()
+        if session is not None:
+            session.close()
+    return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+"""
+⭐ Telegram Stars Rates - Bulk conversion
+
+Converts batches of Star amounts to TON/USDT and back against one rate
+snapshot, exactly with Decimal rounding or vectorized with NumPy.
+"""
+
+import hashlib
+import sys
+from decimal import (
+    Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP
+)
+from typing import Optional, List, Dict, Any, NamedTuple, Sequence, Union, TYPE_CHECKING
+
+from .analyzer import get_stars_rate
+from .stats import load_numpy
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CURRENCIES = ("usdt", "ton")
+DEFAULT_PLACES = {"usdt": 6, "ton": 9}
+
+Amounts = Union[Sequence[Union[int, float, str, Decimal]], "np.ndarray"]
+
+
+class RateSnapshot(NamedTuple):
+    """The rates every conversion of a batch is made with."""
+    snapshot_id: str
+    timestamp: str
+    ton_per_star: float
+    usdt_per_ton: float
+    usdt_per_star: float
+
+    @classmethod
+    def from_rates(cls, rates_data: Dict[str, Any]) -> "RateSnapshot":
+        """Snapshot a get_stars_rate() result; the id is derived from its timestamp and rates."""
+        ton_per_star, usdt_per_ton = rates_data["ton_per_star"], rates_data["usdt_per_ton"]
+        if ton_per_star <= 0 or usdt_per_ton <= 0:
+            raise ValueError(f"Cannot convert with invalid rates: {rates_data.get('errors') or 'no rate'}")
+        key = f"{rates_data['timestamp']}|{ton_per_star!r}|{usdt_per_ton!r}".encode()
+        return cls(
+            snapshot_id=hashlib.sha1(key).hexdigest()[:16],
+            timestamp=rates_data["timestamp"],
+            ton_per_star=ton_per_star,
+            usdt_per_ton=usdt_per_ton,
+            usdt_per_star=ton_per_star * usdt_per_ton
+        )
+
+    def rate(self, currency: str) -> float:
+        """Units of `currency` per Star."""
+        if currency == "usdt":
+            return self.usdt_per_star
+        if currency == "ton":
+            return self.ton_per_star
+        raise ValueError(f"Unknown currency '{currency}', expected one of {', '.join(CURRENCIES)}")
+
+
+class ConversionBatch(NamedTuple):
+    snapshot_id: str
+    timestamp: str
+    currency: str
+    values: Union[List[Decimal], List[int], "np.ndarray"]
+
+
+class StarsConverter:
+    """Convert Star amounts against a fixed RateSnapshot.
+
+    Lists are converted exactly with Decimal and come back as Decimals (or
+    ints for Stars); NumPy arrays, or any input with use_numpy=True, are
+    converted in one vectorized float64 pass. `rounding` is a decimal
+    rounding mode applied at `places[currency]` decimals; Stars are rounded
+    to whole Stars with `stars_rounding`.
+
+    Usage:
+        converter = StarsConverter.fetch(limit=100)
+        batch = converter.to_currency([100, 250, 1000], "usdt")
+        stars = converter.to_stars(batch.values, "usdt")
+    """
+
+    def __init__(
+        self,
+        snapshot: RateSnapshot,
+        places: Optional[Dict[str, int]] = None,
+        rounding: str = ROUND_HALF_UP,
+        stars_rounding: str = ROUND_HALF_UP
+    ):
+        self.snapshot = snapshot
+        self.places = {**DEFAULT_PLACES, **(places or {})}
+        self.rounding = rounding
+        self.stars_rounding = stars_rounding
+        # Exact per-Star rates for the Decimal path, without float product error
+        ton_per_star = _decimal(snapshot.ton_per_star)
+        self._decimal_rates = {"usdt": ton_per_star * _decimal(snapshot.usdt_per_ton), "ton": ton_per_star}
+
+    @classmethod
+    def from_rates(cls, rates_data: Dict[str, Any], **options) -> "StarsConverter":
+        return cls(RateSnapshot.from_rates(rates_data), **options)
+
+    @classmethod
+    def fetch(
+        cls,
+        places: Optional[Dict[str, int]] = None,
+        rounding: str = ROUND_HALF_UP,
+        stars_rounding: str = ROUND_HALF_UP,
+        **kwargs
+    ) -> "StarsConverter":
+        """Snapshot a fresh get_stars_rate(**kwargs) result."""
+        return cls.from_rates(get_stars_rate(**kwargs), places=places, rounding=rounding, stars_rounding=stars_rounding)
+
+    def to_currency(self, stars: Amounts, currency: str = "usdt", use_numpy: Optional[bool] = None) -> ConversionBatch:
+        """Price Star amounts in `currency`, rounded to its places."""
+        rate = self.snapshot.rate(currency)
+        places = self.places[currency]
+        if _vectorized(stars, use_numpy):
+            np = load_numpy()
+            values = _round_numpy(np.asarray(stars, dtype=np.float64) * rate, places, self.rounding)
+        else:
+            quantum = Decimal(1).scaleb(-places)
+            rate = self._decimal_rates[currency]
+            values = [(_decimal(amount) * rate).quantize(quantum, self.rounding) for amount in stars]
+        return self._batch(currency, values)
+
+    def to_stars(self, amounts: Amounts, currency: str = "usdt", use_numpy: Optional[bool] = None) -> ConversionBatch:
+        """Whole Stars bought by amounts of `currency`."""
+        rate = self.snapshot.rate(currency)
+        if _vectorized(amounts, use_numpy):
+            np = load_numpy()
+            values = _round_numpy(np.asarray(amounts, dtype=np.float64) / rate, 0, self.stars_rounding).astype(np.int64)
+        else:
+            rate = self._decimal_rates[currency]
+            values = [int((_decimal(amount) / rate).to_integral_value(self.stars_rounding)) for amount in amounts]
+        return self._batch("stars", values)
+
+    def _batch(self, currency: str, values) -> ConversionBatch:
+        return ConversionBatch(self.snapshot.snapshot_id, self.snapshot.timestamp, currency, values)
+
+
+def _vectorized(amounts: Amounts, use_numpy: Optional[bool]) -> bool:
+    if use_numpy is None:
+        # An ndarray can only be passed in if the caller already imported NumPy
+        np = sys.modules.get("numpy")
+        return np is not None and isinstance(amounts, np.ndarray)
+    if use_numpy and load_numpy() is None:
+        raise ImportError("NumPy is not installed")
+    return use_numpy
+
+
+def _decimal(amount: Union[int, float, str, Decimal]) -> Decimal:
+    if isinstance(amount, (int, str, Decimal)):
+        return Decimal(amount)
+    # str() gives floats (and NumPy scalars) their shortest round-tripping digits: 0.1 -> "0.1"
+    return Decimal(str(amount))
+
+
+def _round_numpy(values: "np.ndarray", places: int, rounding: str) -> "np.ndarray":
+    np = load_numpy()
+    round_scaled = {
+        ROUND_HALF_EVEN: np.round,
+        ROUND_HALF_UP: lambda x: np.sign(x) * np.floor(np.abs(x) + 0.5),
+        ROUND_DOWN: np.trunc,
+        ROUND_UP: lambda x: np.sign(x) * np.ceil(np.abs(x)),
+        ROUND_FLOOR: np.floor,
+        ROUND_CEILING: np.ceil,
+    }.get(rounding)
+    if round_scaled is None:
+        raise ValueError(f"Rounding {rounding} is not supported for NumPy arrays")
+    scale = 10.0 ** places
+    return round_scaled(values * scale) / scale
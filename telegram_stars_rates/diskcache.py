@@ -0,0 +1,92 @@
+"""
+⭐ Telegram Stars Rates - Cross-process cache backend
+
+Stores RateCache results as JSON files in a shared directory. A per-key
+file lock makes sure only one process refetches an expired value while the
+others wait for it and read the new file.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, Hashable, Iterator, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class DiskCache:
+    """RateCache backend shared by every process using the same directory.
+
+    Keys are hashed into file names, so values keyed by objects without a
+    stable repr (a custom estimator callable, a TransactionStore) are only
+    shared within one process. Needs POSIX file locks (fcntl).
+
+    Usage:
+        cache = RateCache(backend=DiskCache("/var/tmp/telegram-stars-rates"))
+    """
+
+    def __init__(self, directory: str, clock: Callable[[], float] = time.time):
+        if fcntl is None:
+            raise ImportError("DiskCache needs fcntl file locks (POSIX only)")
+        self.directory = directory
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def read(self, key: Hashable) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The stored value for key and its age in seconds, or None."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return stored["value"], max(0.0, self.clock() - stored["stored_at"])
+
+    def write(self, key: Hashable, value: Dict[str, Any]):
+        """Store value atomically, so readers never see a partial file."""
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": self.clock(), "value": value}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def load(self, key: Hashable, fetch: Callable[[], Dict[str, Any]], ttl: float) -> Tuple[Dict[str, Any], float]:
+        """Get (value, age) for key, fetching under the key's lock when nothing fresh is stored."""
+        cached = self.read(key)
+        if cached is not None and cached[1] < ttl:
+            return cached
+
+        with self._locked(key):
+            # Another process may have refreshed it while we waited for the lock
+            cached = self.read(key)
+            if cached is not None and cached[1] < ttl:
+                return cached
+            value = fetch()
+            # Failed price lookups come back empty; never share them
+            if value:
+                self.write(key, value)
+            return value, 0.0
+
+    def clear(self):
+        """Remove every stored value."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    @contextmanager
+    def _locked(self, key: Hashable) -> Iterator[None]:
+        with open(self._path(key)[:-len(".json")] + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
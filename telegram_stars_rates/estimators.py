@@ -0,0 +1,236 @@
+"""
+⭐ Telegram Stars Rates - Streaming rate estimators
+
+Online accumulators for the Stars → TON rate. Each estimator is fed one
+transaction at a time with update() and can be read at any point, so a
+long-running process can fold in new transactions instead of recomputing.
+Estimators with `removable` set can also take back a transaction with
+remove(), which lets a RollingWindow keep one across refreshes.
+"""
+
+import bisect
+import heapq
+import math
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, Callable, Type, Union
+
+
+class RateEstimator(ABC):
+    """Base class: update(rate, stars, timestamp) then read .value."""
+
+    name = ""
+    # Whether remove() is supported
+    removable = False
+
+    def __init__(self):
+        self.count = 0
+
+    def update(self, rate: float, stars: float = 1, timestamp: float = 0):
+        self.count += 1
+
+    def remove(self, rate: float, stars: float = 1, timestamp: float = 0):
+        """Undo an earlier update() with the same arguments."""
+        if not self.removable:
+            raise NotImplementedError(f"{type(self).__name__} cannot remove transactions")
+        self.count -= 1
+
+    def add_transaction(self, tx: Dict[str, Any]):
+        """Feed a parse_fragment_transaction result."""
+        self.update(tx["rate_per_star"], tx["stars"], tx["timestamp"])
+
+    def remove_transaction(self, tx: Dict[str, Any]):
+        """Take back a transaction fed with add_transaction()."""
+        self.remove(tx["rate_per_star"], tx["stars"], tx["timestamp"])
+
+    @property
+    @abstractmethod
+    def value(self) -> float:
+        """Current estimate, NaN before the first update."""
+
+
+class MeanEstimator(RateEstimator):
+    """Unweighted arithmetic mean of per-transaction rates."""
+
+    name = "mean"
+    removable = True
+
+    def __init__(self):
+        super().__init__()
+        self.total = 0.0
+
+    def update(self, rate, stars=1, timestamp=0):
+        super().update(rate, stars, timestamp)
+        self.total += rate
+
+    def remove(self, rate, stars=1, timestamp=0):
+        super().remove(rate, stars, timestamp)
+        self.total = self.total - rate if self.count else 0.0
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else math.nan
+
+
+class VWAPEstimator(RateEstimator):
+    """Volume-weighted average: total TON paid over total Stars."""
+
+    name = "vwap"
+    removable = True
+
+    def __init__(self):
+        super().__init__()
+        self.ton = 0.0
+        self.stars = 0.0
+
+    def update(self, rate, stars=1, timestamp=0):
+        super().update(rate, stars, timestamp)
+        self.ton += rate * stars
+        self.stars += stars
+
+    def remove(self, rate, stars=1, timestamp=0):
+        super().remove(rate, stars, timestamp)
+        if not self.count:
+            self.ton = self.stars = 0.0
+            return
+        self.ton -= rate * stars
+        self.stars -= stars
+
+    @property
+    def value(self):
+        return self.ton / self.stars if self.stars else math.nan
+
+
+class DecayedMeanEstimator(RateEstimator):
+    """Exponentially time-decayed mean: a transaction `half_life` seconds older
+    than the newest one counts half as much.
+
+    Sums are kept relative to the newest timestamp seen and rescaled when a
+    newer transaction arrives, so updates may come in any order. Removing a
+    transaction subtracts its weight relative to that same timestamp.
+    """
+
+    name = "decayed"
+    removable = True
+
+    def __init__(self, half_life: float = 3600.0):
+        super().__init__()
+        self.decay = math.log(2) / half_life
+        self.anchor: Optional[float] = None
+        self.weighted = 0.0
+        self.weight = 0.0
+
+    def update(self, rate, stars=1, timestamp=0):
+        super().update(rate, stars, timestamp)
+        if self.anchor is None:
+            self.anchor = timestamp
+        elif timestamp > self.anchor:
+            scale = math.exp(-self.decay * (timestamp - self.anchor))
+            self.weighted *= scale
+            self.weight *= scale
+            self.anchor = timestamp
+
+        weight = math.exp(-self.decay * (self.anchor - timestamp))
+        self.weighted += rate * weight
+        self.weight += weight
+
+    def remove(self, rate, stars=1, timestamp=0):
+        super().remove(rate, stars, timestamp)
+        if not self.count:
+            # Start over from exact zeros instead of carrying rounding error
+            self.anchor = None
+            self.weighted = self.weight = 0.0
+            return
+        weight = math.exp(-self.decay * (self.anchor - timestamp))
+        self.weighted -= rate * weight
+        self.weight -= weight
+
+    @property
+    def value(self):
+        return self.weighted / self.weight if self.weight else math.nan
+
+
+class MedianEstimator(RateEstimator):
+    """Running median over two heaps: O(log n) update, O(1) read."""
+
+    name = "median"
+
+    def __init__(self):
+        super().__init__()
+        self.low = []   # max-heap of the lower half (negated)
+        self.high = []  # min-heap of the upper half
+
+    def update(self, rate, stars=1, timestamp=0):
+        super().update(rate, stars, timestamp)
+        if self.low and rate > -self.low[0]:
+            heapq.heappush(self.high, rate)
+        else:
+            heapq.heappush(self.low, -rate)
+
+        if len(self.low) > len(self.high) + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+        elif len(self.high) > len(self.low):
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+
+    @property
+    def value(self):
+        if not self.low:
+            return math.nan
+        if len(self.low) > len(self.high):
+            return -self.low[0]
+        return (-self.low[0] + self.high[0]) / 2
+
+
+class TrimmedMeanEstimator(RateEstimator):
+    """Mean after cutting the `trim` fraction from each end.
+
+    Rates are kept sorted on insert; the sum of the cut tails is read from the
+    ends of the sorted list, so reads only touch the trimmed values.
+    """
+
+    name = "trimmed_mean"
+    removable = True
+
+    def __init__(self, trim: float = 0.1):
+        super().__init__()
+        self.trim = trim
+        self.ordered = []
+        self.total = 0.0
+
+    def update(self, rate, stars=1, timestamp=0):
+        super().update(rate, stars, timestamp)
+        bisect.insort(self.ordered, rate)
+        self.total += rate
+
+    def remove(self, rate, stars=1, timestamp=0):
+        super().remove(rate, stars, timestamp)
+        del self.ordered[bisect.bisect_left(self.ordered, rate)]
+        self.total = self.total - rate if self.count else 0.0
+
+    @property
+    def value(self):
+        n = len(self.ordered)
+        if not n:
+            return math.nan
+        cut = min(int(n * self.trim), (n - 1) // 2)
+        if not cut:
+            return self.total / n
+        tails = math.fsum(self.ordered[:cut]) + math.fsum(self.ordered[-cut:])
+        return (self.total - tails) / (n - 2 * cut)
+
+
+ESTIMATORS: Dict[str, Type[RateEstimator]] = {
+    cls.name: cls
+    for cls in (MeanEstimator, VWAPEstimator, DecayedMeanEstimator, MedianEstimator, TrimmedMeanEstimator)
+}
+
+EstimatorSpec = Union[str, Callable[[], RateEstimator]]
+
+
+def create_estimator(estimator: EstimatorSpec = "mean") -> RateEstimator:
+    """Build an estimator from a name in ESTIMATORS or a zero-argument factory,
+    e.g. functools.partial(DecayedMeanEstimator, half_life=600)."""
+    if isinstance(estimator, str):
+        if estimator not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator '{estimator}', expected one of: {', '.join(ESTIMATORS)}")
+        return ESTIMATORS[estimator]()
+    return estimator()
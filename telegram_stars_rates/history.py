@@ -0,0 +1,163 @@
+"""
+⭐ Telegram Stars Rates - Binary rate history
+
+Append-only file of fixed-width (timestamp, usdt_per_star, ton_per_star,
+usdt_per_ton) records, memory-mapped for reading, with bisect range lookups
+and an exporter back to the daily history.json shape.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Iterable, Iterator, NamedTuple
+
+from .pages import HISTORY_DAYS, history_point
+
+MAGIC = b"TSRH\x01\x00\x00\x00"
+RECORD = struct.Struct("<qddd")
+DAY_SECONDS = 86400
+
+
+class HistoryRecord(NamedTuple):
+    timestamp: int
+    usdt_per_star: float
+    ton_per_star: float
+    usdt_per_ton: float
+
+
+class _Timestamps:
+    """Read-only sequence view of the record timestamps, for bisect."""
+
+    def __init__(self, buffer: mmap.mmap, count: int):
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        return struct.unpack_from("<q", self._buffer, len(MAGIC) + index * RECORD.size)[0]
+
+
+class HistoryStore:
+    """Rate history on disk, RECORD.size bytes per point, oldest first.
+
+    Usage:
+        history = HistoryStore("history.bin")
+        history.append_rates(get_stars_rate())
+        points = history.export_daily()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        header = self._file.read(len(MAGIC))
+        if len(header) < len(MAGIC) and MAGIC.startswith(header):
+            # New file, or one whose header write was interrupted
+            self._file.truncate(0)
+            self._file.write(MAGIC)
+            self._file.flush()
+        elif header != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a rate history file")
+        # Drop a record cut short by an interrupted append, or every later
+        # O_APPEND write would land out of step with the record grid
+        partial = (os.fstat(self._file.fileno()).st_size - len(MAGIC)) % RECORD.size
+        if partial:
+            self._file.truncate(len(MAGIC) + len(self) * RECORD.size)
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._last_timestamp: Optional[int] = None
+
+    def __len__(self) -> int:
+        return (os.fstat(self._file.fileno()).st_size - len(MAGIC)) // RECORD.size
+
+    def append(self, timestamp: int, usdt_per_star: float, ton_per_star: float, usdt_per_ton: float):
+        """Append one point; timestamps must not go backwards."""
+        if self._last_timestamp is None:
+            last = self.last()
+            self._last_timestamp = last.timestamp if last is not None else timestamp
+        if timestamp < self._last_timestamp:
+            raise ValueError(f"timestamp {timestamp} is older than the last record ({self._last_timestamp})")
+        self._file.write(RECORD.pack(timestamp, usdt_per_star, ton_per_star, usdt_per_ton))
+        self._file.flush()
+        self._last_timestamp = timestamp
+
+    def append_rates(self, rates_data: Dict[str, Any]):
+        """Append a get_stars_rate() result."""
+        self.append(
+            _unix(rates_data["timestamp"]),
+            rates_data["usdt_per_star"],
+            rates_data["ton_per_star"],
+            rates_data["usdt_per_ton"]
+        )
+
+    def extend(self, points: Iterable[Dict[str, Any]]) -> int:
+        """Append history.json-shaped points in date order, returning how many were added."""
+        count = 0
+        for point in sorted(points, key=lambda p: p["timestamp"]):
+            self.append_rates(point)
+            count += 1
+        return count
+
+    def last(self) -> Optional[HistoryRecord]:
+        count = len(self)
+        return self._record(self._view(), count - 1) if count else None
+
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[HistoryRecord]:
+        """Records with start <= timestamp < end, found by binary search."""
+        buffer = self._view()
+        timestamps = _Timestamps(buffer, len(self))
+        lo = bisect.bisect_left(timestamps, start) if start is not None else 0
+        hi = bisect.bisect_left(timestamps, end) if end is not None else len(timestamps)
+        for index in range(lo, hi):
+            yield self._record(buffer, index)
+
+    def export_daily(self, max_days: int = HISTORY_DAYS) -> List[Dict[str, Any]]:
+        """Last point of each of the `max_days` most recent days with data, in the history.json shape."""
+        buffer = self._view()
+        timestamps = _Timestamps(buffer, len(self))
+        daily: List[HistoryRecord] = []
+        index = len(timestamps) - 1
+        # Jump from each day's last record to the previous day's by binary search
+        while index >= 0 and len(daily) < max_days:
+            record = self._record(buffer, index)
+            daily.append(record)
+            index = bisect.bisect_left(timestamps, record.timestamp - record.timestamp % DAY_SECONDS, 0, index) - 1
+        return [history_point(_rates_data(record)) for record in reversed(daily)]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _view(self) -> mmap.mmap:
+        """Map the file, remapping after it has grown."""
+        size = len(MAGIC) + len(self) * RECORD.size
+        if self._map is None or size != self._mapped_size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return self._map
+
+    @staticmethod
+    def _record(buffer: mmap.mmap, index: int) -> HistoryRecord:
+        return HistoryRecord(*RECORD.unpack_from(buffer, len(MAGIC) + index * RECORD.size))
+
+
+def _unix(timestamp: str) -> int:
+    return int(datetime.fromisoformat(timestamp).timestamp())
+
+
+def _rates_data(record: HistoryRecord) -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.fromtimestamp(record.timestamp, timezone.utc).isoformat(),
+        "usdt_per_star": record.usdt_per_star,
+        "ton_per_star": record.ton_per_star,
+        "usdt_per_ton": record.usdt_per_ton
+    }
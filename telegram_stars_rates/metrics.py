@@ -0,0 +1,178 @@
+"""
+⭐ Telegram Stars Rates - Per-stage timing and metrics
+
+get_stars_rate records stage durations and counters into a Trace carried in
+a context variable, so nothing is measured unless a trace was requested
+with include_metrics=True or a hook is registered. Finished traces are
+passed to every hook, e.g. a PrometheusExporter.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Any, Callable, Iterator, Sequence
+
+MetricsHook = Callable[["Trace"], None]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Trace:
+    """Stage durations (seconds), counters and the price source of one get_stars_rate call.
+
+    Stages: total, fragment, ton_usdt, rate_limit_wait, tonapi_request,
+    json_decode, parse, store_read, summarize. Counters: tonapi_requests,
+    tonapi_throttled, bytes_received, price_sources_queried, cache_hits,
+    timeouts, errors.
+    """
+    __slots__ = ("stages", "counters", "source", "_lock")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.source: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"stages": dict(self.stages), "counters": dict(self.counters), "source": self.source}
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("stars_rate_trace", default=None)
+_hooks: List[MetricsHook] = []
+
+
+def add_hook(hook: MetricsHook):
+    """Call hook(trace) after every get_stars_rate call."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: MetricsHook):
+    _hooks.remove(hook)
+
+
+def has_hooks() -> bool:
+    return bool(_hooks)
+
+
+def current_trace() -> Optional[Trace]:
+    """The trace being recorded in this context, or None when metrics are off."""
+    return _current.get()
+
+
+@contextmanager
+def tracing(trace: Trace) -> Iterator[Trace]:
+    """Make trace the current one for this context."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def emit(trace: Trace):
+    """Pass a finished trace to every hook."""
+    for hook in list(_hooks):
+        hook(trace)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the time spent in the block to stage `name` of the current trace."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_time(name, time.perf_counter() - start)
+
+
+def add_time(stage_name: str, seconds: float):
+    if (trace := _current.get()) is not None:
+        trace.add_time(stage_name, seconds)
+
+
+def count(name: str, value: int = 1):
+    if (trace := _current.get()) is not None:
+        trace.count(name, value)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "total")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.total = 0
+
+
+class PrometheusExporter:
+    """Hook aggregating traces into Prometheus counters and histograms.
+
+    Usage:
+        exporter = PrometheusExporter()
+        add_hook(exporter)
+        print(exporter.render())  # text exposition format
+    """
+
+    def __init__(self, prefix: str = "stars_rate", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[str, _Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._sources: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: Trace):
+        self.observe(trace.as_dict())
+
+    def observe(self, data: Dict[str, Any]):
+        """Add one Trace.as_dict() (the "metrics" entry of a get_stars_rate result)."""
+        with self._lock:
+            for stage_name, seconds in data["stages"].items():
+                histogram = self._histograms.get(stage_name)
+                if histogram is None:
+                    histogram = self._histograms[stage_name] = _Histogram(len(self.buckets))
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        histogram.counts[i] += 1
+                histogram.sum += seconds
+                histogram.total += 1
+            for name, value in data["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            if data["source"]:
+                self._sources[data["source"]] = self._sources.get(data["source"], 0) + 1
+
+    def render(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            name = f"{self.prefix}_stage_seconds"
+            lines += [f"# HELP {name} Time spent per get_stars_rate stage.", f"# TYPE {name} histogram"]
+            for stage_name, histogram in sorted(self._histograms.items()):
+                for bound, value in zip(self.buckets, histogram.counts):
+                    lines.append(f'{name}_bucket{{stage="{stage_name}",le="{bound:g}"}} {value}')
+                lines.append(f'{name}_bucket{{stage="{stage_name}",le="+Inf"}} {histogram.total}')
+                lines.append(f'{name}_sum{{stage="{stage_name}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{stage_name}"}} {histogram.total}')
+
+            for counter, value in sorted(self._counters.items()):
+                name = f"{self.prefix}_{counter}_total"
+                lines += [f"# TYPE {name} counter", f"{name} {value}"]
+
+            name = f"{self.prefix}_price_source_total"
+            lines += [f"# HELP {name} TON/USDT prices by source.", f"# TYPE {name} counter"]
+            lines += [f'{name}{{source="{source}"}} {value}' for source, value in sorted(self._sources.items())]
+        return "\n".join(lines) + "\n"
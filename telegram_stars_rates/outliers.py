@@ -0,0 +1,118 @@
+"""
+⭐ Telegram Stars Rates - Streaming outlier filter
+
+Hampel filter over a stream of transactions: each rate is compared with the
+median of the rates around it and rejected when it is further away than
+`threshold` robust standard deviations (1.4826 × MAD). The window is kept
+sorted incrementally, so each transaction costs a fixed amount of work for a
+given window size however long the stream is.
+"""
+
+import bisect
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List
+
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 1.4826
+# No real purchase costs 1 TON or more per Star; such rates are test or broken transfers
+MAX_RATE_PER_STAR = 1.0
+
+
+def is_plausible(rate: float) -> bool:
+    """Physical bound checked before the Hampel filter, which cannot judge small samples."""
+    return 0 < rate <= MAX_RATE_PER_STAR
+
+
+class HampelFilter:
+    """Rolling median/MAD outlier rejection.
+
+    The window is centered on the rate being tested, so decisions lag the
+    stream by window // 2 transactions and the first ones are judged with
+    the rates after them. Rates within `min_deviation` (a fraction of the
+    median) are always kept; Fragment rates are often identical, and a
+    zero MAD would otherwise reject every change in price. Rejected rates
+    stay in the window, so the median follows a real move in price.
+
+    The window carries over between filter() calls: a long-lived filter
+    judges each new batch against the rates before it, so a refresh that
+    brings a single transaction can still reject it.
+
+    Usage:
+        outliers = HampelFilter(window=25, threshold=3.0)
+        kept = list(outliers.filter(transactions))
+        print(outliers.rejected)
+    """
+
+    def __init__(self, window: int = 25, threshold: float = 3.0, min_deviation: float = 0.01):
+        if window < 3:
+            raise ValueError("Hampel window must hold at least 3 rates")
+        self.window = window
+        self.threshold = threshold
+        self.min_deviation = min_deviation
+        self.accepted = 0
+        self.rejected = 0
+        self._rates = deque()
+        self._ordered: List[float] = []
+
+    def filter(self, transactions: Iterable[Dict[str, Any]], key: str = "rate_per_star") -> Iterator[Dict[str, Any]]:
+        """Yield the transactions whose `key` rate is not an outlier, in input order.
+
+        The last window // 2 transactions of each call are judged with the
+        rates before them only, as nothing newer has arrived yet.
+        """
+        half = self.window // 2
+        rates = self._rates
+        ordered = self._ordered
+        pending = deque()
+
+        for tx in transactions:
+            rate = tx[key]
+            rates.append(rate)
+            bisect.insort(ordered, rate)
+            if len(rates) > self.window:
+                del ordered[bisect.bisect_left(ordered, rates.popleft())]
+            pending.append(tx)
+            # The oldest pending rate now has `half` rates on each side
+            if len(pending) > half:
+                tx = pending.popleft()
+                if self._keep(tx[key], ordered):
+                    yield tx
+
+        for tx in pending:
+            if self._keep(tx[key], ordered):
+                yield tx
+
+    def _keep(self, rate: float, ordered: List[float]) -> bool:
+        median = _median(ordered)
+        limit = max(self.threshold * MAD_SCALE * _mad(ordered, median), self.min_deviation * abs(median))
+        if rate > 0 and abs(rate - median) <= limit:
+            self.accepted += 1
+            return True
+        self.rejected += 1
+        return False
+
+
+OutlierSpec = Optional[Callable[[], HampelFilter]]
+
+
+def _median(ordered: List[float]) -> float:
+    n = len(ordered)
+    middle = n // 2
+    return ordered[middle] if n % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def _mad(ordered: List[float], median: float) -> float:
+    """Median absolute deviation of sorted values, walking outwards from the median."""
+    n = len(ordered)
+    left = bisect.bisect_left(ordered, median) - 1
+    right = left + 1
+    deviations = []
+    # Deviations come out in increasing order; only the lower half is needed
+    while len(deviations) <= n // 2:
+        if right >= n or (left >= 0 and median - ordered[left] <= ordered[right] - median):
+            deviations.append(median - ordered[left])
+            left -= 1
+        else:
+            deviations.append(ordered[right] - median)
+            right += 1
+    return deviations[-1] if n % 2 else (deviations[-2] + deviations[-1]) / 2
@@ -0,0 +1,50 @@
+"""
+⭐ Telegram Stars Rates - Published JSON documents
+
+Builders for the api.json / history.json documents served on GitHub Pages
+and by the local rate server.
+"""
+
+from typing import List, Dict, Any
+
+HISTORY_DAYS = 90
+
+
+def build_api_data(rates_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Simplified api.json document from a get_stars_rate(include_raw=True) result."""
+    return {
+        "usdt_per_star": rates_data["usdt_per_star"],
+        "ton_per_star": rates_data["ton_per_star"],
+        "usdt_per_ton": rates_data["usdt_per_ton"],
+        "timestamp": rates_data["timestamp"],
+        "transactions_analyzed": rates_data.get("fragment_raw", {}).get("transactions_count", 0),
+        "source": "fragment_blockchain_analysis",
+        "rate_source": rates_data.get("binance_raw", {}).get("source", "unknown"),
+        "last_updated": rates_data["timestamp"]
+    }
+
+
+def history_point(rates_data: Dict[str, Any]) -> Dict[str, Any]:
+    """One daily history.json entry."""
+    return {
+        "date": rates_data["timestamp"][:10],  # YYYY-MM-DD format
+        "timestamp": rates_data["timestamp"],
+        "usdt_per_star": round(rates_data["usdt_per_star"], 6),
+        "ton_per_star": round(rates_data["ton_per_star"], 6),
+        "usdt_per_ton": round(rates_data["usdt_per_ton"], 3)
+    }
+
+
+def update_history(
+    history_data: List[Dict[str, Any]],
+    rates_data: Dict[str, Any],
+    max_days: int = HISTORY_DAYS
+) -> List[Dict[str, Any]]:
+    """Add or replace today's point, keeping the last `max_days` days sorted by date."""
+    current_point = history_point(rates_data)
+    today = current_point["date"]
+
+    history_data = [h for h in history_data if h.get("date") != today]
+    history_data.append(current_point)
+    history_data.sort(key=lambda x: x["date"])
+    return history_data[-max_days:]
@@ -0,0 +1,221 @@
+"""
+⭐ Telegram Stars Rates - TON → USDT price sources
+
+Registry of price sources queried with hedged requests (the preferred source
+first, the next one after a short delay if it has not answered) or all at
+once for a median, with per-source latency tracking so the fastest healthy
+source is preferred.
+"""
+
+import statistics
+import threading
+import time
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from typing import Optional, List, Dict, Any, Callable, Set, Tuple, TYPE_CHECKING
+
+from . import analyzer, metrics
+from .analyzer import get_timestamp
+from .session import get_session
+
+if TYPE_CHECKING:
+    import requests
+
+PriceFetcher = Callable[["requests.Session"], Dict[str, Any]]
+
+OKX_URL = "https://www.okx.com"
+BYBIT_URL = "https://api.bybit.com"
+
+# Seconds a source is skipped in favour of healthy ones after a failure
+FAILURE_COOLDOWN = 60.0
+LATENCY_SMOOTHING = 0.3
+
+
+def _price_result(price: float, source: str) -> Dict[str, Any]:
+    if price > 0:
+        return {"usdt_per_ton": price, "last_updated": get_timestamp(), "source": source}
+    return {}
+
+
+def fetch_binance(session: "requests.Session") -> Dict[str, Any]:
+    """Binance TONUSDT ticker, without the CoinGecko fallback."""
+    response = session.get(f"{analyzer.BINANCE_URL}/api/v3/ticker/price?symbol=TONUSDT", timeout=10)
+    response.raise_for_status()
+    return analyzer._binance_price(response.json())
+
+
+def fetch_coingecko(session: "requests.Session") -> Dict[str, Any]:
+    response = session.get(
+        f"{analyzer.COINGECKO_URL}/api/v3/simple/price?ids=the-open-network&vs_currencies=usd", timeout=10
+    )
+    response.raise_for_status()
+    return analyzer._coingecko_price(response.json())
+
+
+def fetch_okx(session: "requests.Session") -> Dict[str, Any]:
+    response = session.get(f"{OKX_URL}/api/v5/market/ticker?instId=TON-USDT", timeout=10)
+    response.raise_for_status()
+    return _price_result(float(response.json()["data"][0]["last"]), "okx")
+
+
+def fetch_bybit(session: "requests.Session") -> Dict[str, Any]:
+    response = session.get(f"{BYBIT_URL}/v5/market/tickers?category=spot&symbol=TONUSDT", timeout=10)
+    response.raise_for_status()
+    return _price_result(float(response.json()["result"]["list"][0]["lastPrice"]), "bybit")
+
+
+PRICE_SOURCES: Dict[str, PriceFetcher] = {
+    "binance": fetch_binance,
+    "okx": fetch_okx,
+    "bybit": fetch_bybit,
+    "coingecko": fetch_coingecko,
+}
+
+
+def register_price_source(name: str, fetcher: PriceFetcher):
+    """Add or replace a source. fetcher(session) returns a ton_to_usdt_binance-shaped
+    dict, or {} / raises when it has no price."""
+    PRICE_SOURCES[name] = fetcher
+
+
+class SourceHealth:
+    """Smoothed latency and last failure time of one source."""
+    __slots__ = ("latency", "failed_at")
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.failed_at: Optional[float] = None
+
+
+class PriceAggregator:
+    """Query several price sources.
+
+    mode="first" sends a hedged request: the preferred source is asked first
+    and, every `hedge_delay` seconds without a good answer, the next one is
+    asked too; the first valid price wins. mode="median" asks every source at
+    once and returns the median of the prices received before `timeout`.
+    """
+
+    def __init__(
+        self,
+        sources: Optional[List[str]] = None,
+        mode: str = "first",
+        hedge_delay: float = 0.3,
+        timeout: float = 10.0
+    ):
+        if mode not in ("first", "median"):
+            raise ValueError(f"Unknown mode '{mode}', expected 'first' or 'median'")
+        self.sources = sources
+        self.mode = mode
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.health: Dict[str, SourceHealth] = {}
+        self._lock = threading.Lock()
+
+    def ranked_sources(self) -> List[str]:
+        """Sources ordered healthy first, then by smoothed latency, then registration order."""
+        names = [name for name in (self.sources or PRICE_SOURCES) if name in PRICE_SOURCES]
+        now = time.monotonic()
+
+        def rank(name):
+            health = self.health.get(name)
+            if health is None:
+                return (False, float("inf"))
+            cooling = health.failed_at is not None and now - health.failed_at < FAILURE_COOLDOWN
+            return (cooling, health.latency if health.latency is not None else float("inf"))
+
+        return sorted(names, key=rank)
+
+    def get_price(self, session: Optional["requests.Session"] = None) -> Dict[str, Any]:
+        """Get TON → USDT price, or {} when no source answered in time."""
+        session = session or get_session()
+        names = self.ranked_sources()
+        if self.mode == "median":
+            return self._median(names, session)
+        return self._hedged(names, session)
+
+    def _submit(self, name: str, session: "requests.Session") -> Future:
+        # Daemon thread, so a source that lost the race never delays interpreter exit
+        return analyzer._submit_daemon(self._fetch, name, session, name="ton-price")
+
+    def _record(self, name: str, elapsed: float, ok: bool):
+        with self._lock:
+            health = self.health.setdefault(name, SourceHealth())
+            if ok:
+                self._record_latency(health, elapsed)
+                health.failed_at = None
+            else:
+                health.failed_at = time.monotonic()
+
+    @staticmethod
+    def _record_latency(health: SourceHealth, elapsed: float):
+        health.latency = elapsed if health.latency is None else (
+            LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * health.latency
+        )
+
+    def _fetch(self, name: str, session: "requests.Session") -> Dict[str, Any]:
+        start = time.monotonic()
+        try:
+            result = PRICE_SOURCES[name](session)
+        except Exception:
+            result = {}
+        self._record(name, time.monotonic() - start, bool(result))
+        return result
+
+    def _hedged(self, names: List[str], session: "requests.Session") -> Dict[str, Any]:
+        deadline = time.monotonic() + self.timeout
+        started: Dict[Future, Tuple[str, float]] = {}
+        pending: Set[Future] = set()
+
+        for i, name in enumerate(names):
+            future = self._submit(name, session)
+            started[future] = (name, time.monotonic())
+            metrics.count("price_sources_queried")
+            pending.add(future)
+            last = i == len(names) - 1
+            hedge_at = deadline if last else min(deadline, time.monotonic() + self.hedge_delay)
+
+            # Wait for a good answer until it is time to ask the next source
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, hedge_at - time.monotonic()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if result := future.result():
+                        self._penalize_losers(pending, started)
+                        return result
+                if not done:
+                    break
+            if time.monotonic() >= deadline:
+                break
+        return {}
+
+    def _penalize_losers(self, pending: Set[Future], started: Dict[Future, Tuple[str, float]]):
+        """Count the time slower sources have taken so far right away, so the
+        ranking adapts before their requests finish. Their health is left
+        alone: a source still cooling down from a failure has not recovered."""
+        now = time.monotonic()
+        with self._lock:
+            for future in pending:
+                name, start = started[future]
+                self._record_latency(self.health.setdefault(name, SourceHealth()), now - start)
+
+    def _median(self, names: List[str], session: "requests.Session") -> Dict[str, Any]:
+        futures = {self._submit(name, session): name for name in names}
+        metrics.count("price_sources_queried", len(futures))
+        done, _ = wait(futures, timeout=self.timeout)
+
+        prices = {futures[f]: f.result()["usdt_per_ton"] for f in done if f.result()}
+        if not prices:
+            return {}
+        result = _price_result(statistics.median(prices.values()), "median")
+        result["sources"] = prices
+        return result
+
+
+default_aggregator = PriceAggregator()
+
+
+def get_ton_usdt_price(
+    session: Optional["requests.Session"] = None,
+    aggregator: Optional[PriceAggregator] = None
+) -> Dict[str, Any]:
+    """Get TON → USDT exchange rate from the fastest healthy source (hedged)."""
+    return (aggregator or default_aggregator).get_price(session)
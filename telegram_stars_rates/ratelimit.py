@@ -0,0 +1,143 @@
+"""
+⭐ Telegram Stars Rates - tonapi rate limiting
+
+Token buckets shared per API key, Retry-After aware jittered exponential
+backoff, and counters of throttled and retried requests.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Callable
+
+# Requests per second when an API key is used and no rate was configured
+DEFAULT_KEYED_RPS = 10.0
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+
+class TokenBucket:
+    """Token bucket handing out reservations, usable from threads and coroutines.
+
+    reserve() takes a token and returns how long the caller must wait before
+    using it, so sync code sleeps and async code awaits the same limiter.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning the seconds to wait before it may be used."""
+        with self._lock:
+            now = self.clock()
+            wait = max(0.0, self._blocked_until - now)
+            if self.rate <= 0:
+                return wait
+
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    def penalize(self, seconds: float):
+        """Hold every caller for `seconds`, e.g. after the server answered 429."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self.clock() + seconds)
+
+
+class RateLimitStats:
+    """Thread-safe counters for tonapi requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.throttled = 0
+            self.retried = 0
+            self.waited = 0.0
+
+    def record(self, requests: int = 0, throttled: int = 0, retried: int = 0, waited: float = 0.0):
+        with self._lock:
+            self.requests += requests
+            self.throttled += throttled
+            self.retried += retried
+            self.waited += waited
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "retried": self.retried,
+                "waited_seconds": self.waited
+            }
+
+
+stats = RateLimitStats()
+_limiters: Dict[Optional[str], TokenBucket] = {}
+_configured: Dict[Optional[str], bool] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_rate_limit(api_key: Optional[str], rps: float, burst: float = 1.0):
+    """Set the request budget for an API key (None for keyless requests)."""
+    with _limiters_lock:
+        _limiters[api_key] = TokenBucket(rps, burst)
+        _configured[api_key] = True
+
+
+def get_limiter(api_key: Optional[str], rate_limit_delay: float = 2.0) -> TokenBucket:
+    """Get the bucket shared by every request made with api_key.
+
+    Unless configure_rate_limit() was called, keyless requests are spaced
+    `rate_limit_delay` seconds apart and keyed ones get DEFAULT_KEYED_RPS.
+    """
+    rps = DEFAULT_KEYED_RPS if api_key else (1 / rate_limit_delay if rate_limit_delay > 0 else 0)
+    with _limiters_lock:
+        limiter = _limiters.get(api_key)
+        if limiter is None:
+            limiter = _limiters[api_key] = TokenBucket(rps)
+        elif not _configured.get(api_key):
+            limiter.rate = rps
+        return limiter
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # Imported here: email.utils is slow to import and HTTP dates are rare
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff for a 0-based attempt, never shorter than Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    server_delay = retry_after_seconds(retry_after)
+    return max(delay, server_delay) if server_delay is not None else delay
+
+
+def get_rate_limit_stats() -> Dict[str, float]:
+    """Counters of tonapi requests, 429 responses, retries and time spent waiting."""
+    return stats.as_dict()
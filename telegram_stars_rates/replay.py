@@ -0,0 +1,147 @@
+"""
+⭐ Telegram Stars Rates - Record and replay upstream responses
+
+RecordingSession writes every raw tonapi / price API response to a gzipped
+NDJSON file; ReplaySession streams such a file back in place of the network,
+so the same parsing and statistics run offline, at full speed or time-scaled.
+Both are drop-in `session=` arguments.
+"""
+
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, Hashable, Iterator, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .session import get_session
+
+# Response headers the pipeline reads (Retry-After for 429 backoff)
+RECORDED_HEADERS = ("Content-Type", "Retry-After")
+
+
+def request_key(url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Hashable, ...]:
+    """Match requests by path and query only, so a dump replays against any base URL."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + [(name, str(value)) for name, value in (params or {}).items()]
+    return (parts.path, tuple(sorted(query)))
+
+
+class RecordingSession:
+    """Session wrapper appending each response to a gzipped NDJSON dump.
+
+    Request headers (and so API keys) are not recorded.
+
+    Usage:
+        with RecordingSession("responses.ndjson.gz") as session:
+            get_stars_rate(session=session)
+    """
+
+    def __init__(self, path: str, session: Optional[requests.Session] = None):
+        self.path = path
+        self.session = session or get_session()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        start = time.monotonic()
+        response = self.session.get(url, params=params, **kwargs)
+        record = {
+            "time": time.time(),
+            "elapsed": time.monotonic() - start,
+            "url": url,
+            "params": params or {},
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            "body": response.text
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+        return response
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplaySession:
+    """Session answering requests from a RecordingSession dump.
+
+    The dump is read lazily: each request takes the next recorded response
+    with the same path and query, and responses skipped on the way are kept
+    for later requests, so concurrent legs may ask in any order. With
+    `speed` each response waits its recorded latency divided by `speed`;
+    None replays at full speed. A request with no recorded response left
+    raises LookupError.
+
+    Usage:
+        with ReplaySession("responses.ndjson.gz") as session:
+            get_stars_rate(session=session, rate_limit_delay=0)
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = None):
+        self.path = path
+        self.speed = speed
+        self.replayed = 0
+        self._file = gzip.open(path, "rt", encoding="utf-8")
+        self._records = self._read()
+        self._pending: Dict[Tuple[Hashable, ...], Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        key = request_key(url, params)
+        with self._lock:
+            record = self._next(key)
+            self.replayed += record is not None
+        if record is None:
+            raise LookupError(f"No recorded response left for {key[0]} {dict(key[1])}")
+        if self.speed:
+            time.sleep(record["elapsed"] / self.speed)
+        return _response(url, record)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next(self, key: Tuple[Hashable, ...]) -> Optional[Dict[str, Any]]:
+        pending = self._pending.get(key)
+        if pending:
+            return pending.popleft()
+        for record in self._records:
+            record_key = request_key(record["url"], record["params"])
+            if record_key == key:
+                return record
+            self._pending.setdefault(record_key, deque()).append(record)
+        return None
+
+    def _read(self) -> Iterator[Dict[str, Any]]:
+        for line in self._file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _response(url: str, record: Dict[str, Any]) -> requests.Response:
+    response = requests.Response()
+    response.url = url
+    response.status_code = record["status"]
+    response.headers = CaseInsensitiveDict(record["headers"])
+    response.encoding = "utf-8"
+    response._content = record["body"].encode("utf-8")
+    return response
@@ -0,0 +1,186 @@
+"""
+⭐ Telegram Stars Rates - Local HTTP rate server
+
+Refreshes rates in the background and serves /api.json, /rates.json and
+/history.json from pre-serialized (and pre-gzipped) bytes with ETags, plus
+Prometheus metrics of the refreshes on /metrics when enabled.
+"""
+
+import gzip
+import hashlib
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, List, Dict, Any
+
+from .analyzer import get_stars_rate
+from .history import HistoryStore
+from .metrics import PrometheusExporter
+from .pages import build_api_data, update_history
+from .store import TransactionStore
+
+
+class Document:
+    """A JSON document serialized once per refresh."""
+    __slots__ = ("body", "gzipped", "etag")
+
+    def __init__(self, data: Any):
+        self.body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.gzipped = gzip.compress(self.body)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+
+class RateServer:
+    """Background refresher plus threaded HTTP server.
+
+    Usage:
+        server = RateServer(port=8080, refresh_interval=60)
+        server.serve_forever()
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        refresh_interval: float = 60.0,
+        limit: int = 100,
+        store: Optional[TransactionStore] = None,
+        exporter: Optional[PrometheusExporter] = None,
+        history_store: Optional[HistoryStore] = None,
+        **kwargs
+    ):
+        self.refresh_interval = refresh_interval
+        self.exporter = exporter
+        self.limit = limit
+        self.store = store or TransactionStore()
+        self.kwargs = kwargs
+        self.documents: Dict[str, Document] = {}
+        self.history_store = history_store
+        # With a HistoryStore /history.json survives restarts; otherwise it starts empty
+        self.history: List[Dict[str, Any]] = history_store.export_daily() if history_store is not None else []
+        self._stop = threading.Event()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        return self._httpd.server_address[:2]
+
+    def refresh(self) -> Dict[str, Any]:
+        """Fetch rates and swap in new documents if the rate is valid."""
+        rates_data = get_stars_rate(
+            limit=self.limit,
+            include_raw=True,
+            store=self.store,
+            include_metrics=self.exporter is not None,
+            **self.kwargs
+        )
+        if self.exporter is not None:
+            self.exporter.observe(rates_data.pop("metrics"))
+        if rates_data["usdt_per_star"] > 0:
+            if self.history_store is not None:
+                self.history_store.append_rates(rates_data)
+                self.history = self.history_store.export_daily()
+            else:
+                self.history = update_history(self.history, rates_data)
+            # Replace the whole mapping so readers never see a partial update
+            self.documents = {
+                "/api.json": Document(build_api_data(rates_data)),
+                "/rates.json": Document(rates_data),
+                "/history.json": Document(self.history),
+            }
+        return rates_data
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                rates_data = self.refresh()
+                if rates_data["errors"]:
+                    print(f"⚠️ Refresh warnings: {rates_data['errors']}", file=sys.stderr)
+            except Exception as e:
+                print(f"❌ Refresh failed: {e}", file=sys.stderr)
+            self._stop.wait(self.refresh_interval)
+
+    def _start_refresher(self):
+        threading.Thread(target=self._refresh_loop, daemon=True, name="stars-rate-refresh").start()
+
+    def start(self):
+        """Start the refresher and the HTTP server in background threads."""
+        self._start_refresher()
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="stars-rate-http").start()
+        return self
+
+    def serve_forever(self):
+        """Refresh in the background and serve HTTP in the calling thread."""
+        self._start_refresher()
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def _respond(self, send_body: bool):
+                path = self.path.split("?", 1)[0]
+                if path == "/":
+                    path = "/api.json"
+                if path == "/metrics" and server.exporter is not None:
+                    self._send_metrics(send_body)
+                    return
+                document = server.documents.get(path)
+                if document is None:
+                    status = 404 if path not in ("/api.json", "/rates.json", "/history.json") else 503
+                    self.send_error(status)
+                    return
+
+                if self.headers.get("If-None-Match") == document.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", document.etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+                body = document.gzipped if use_gzip else document.body
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("ETag", document.etag)
+                self.send_header("Cache-Control", f"public, max-age={int(server.refresh_interval)}")
+                self.send_header("Vary", "Accept-Encoding")
+                if use_gzip:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def _send_metrics(self, send_body: bool):
+                body = server.exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
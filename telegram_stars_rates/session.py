@@ -0,0 +1,59 @@
+"""
+⭐ Telegram Stars Rates - Pooled HTTP session shared by all upstream fetchers
+"""
+
+import threading
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_HEADERS = {
+    "User-Agent": "telegram-stars-rates/1.0",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+_default_session: Optional["requests.Session"] = None
+_default_session_lock = threading.Lock()
+
+
+def create_session(
+    pool_size: int = 10,
+    retries: int = 2,
+    backoff_factor: float = 0.3
+) -> "requests.Session":
+    """Create a keep-alive session with a sized connection pool and retry adapter.
+
+    Connection errors and 5xx responses are retried by the adapter; HTTP 429 is
+    left to the caller so tonapi throttling keeps its own handling.
+    """
+    # Imported on first use so importing the package or running the CLI stays fast
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(500, 502, 503, 504),
+        # urllib3 would otherwise retry 429 + Retry-After on its own
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> "requests.Session":
+    """Get the process-wide shared session, creating it on first use."""
+    global _default_session
+    if _default_session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                _default_session = create_session()
+    return _default_session
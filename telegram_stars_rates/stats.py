@@ -0,0 +1,119 @@
+"""
+⭐ Telegram Stars Rates - Rate statistics
+
+Summary statistics over a compact buffer of per-transaction rates, using
+NumPy when it is installed and a pure-Python fallback otherwise. NumPy is
+imported on first use, not with the package.
+"""
+
+import math
+from typing import Optional, Dict, Any, Sequence, Tuple
+
+_numpy = None
+
+DEFAULT_PERCENTILES = (5, 25, 75, 95)
+
+
+def load_numpy():
+    """NumPy, imported on first call, or None when it is not installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+def summarize_rates(
+    rates: Sequence[float],
+    weights: Optional[Sequence[float]] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    trim: float = 0.1,
+    use_numpy: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Compute mean, median, min, max, stddev, trimmed mean, weighted average and percentiles.
+
+    `weights` (e.g. Stars per transaction) drive the volume-weighted average and
+    default to equal weights. `trim` is the fraction cut from each end for the
+    trimmed mean. Percentiles use linear interpolation, like numpy.percentile.
+    """
+    if not len(rates):
+        raise ValueError("No rates to summarize")
+    if use_numpy is None:
+        use_numpy = load_numpy() is not None
+    if use_numpy and load_numpy() is None:
+        raise ImportError("NumPy is not installed")
+
+    summarize = _summarize_numpy if use_numpy else _summarize_python
+    return summarize(rates, weights, percentiles, trim)
+
+
+def _trim_count(n: int, trim: float) -> int:
+    """Values cut from each end for the trimmed mean, leaving at least one."""
+    return min(int(n * trim), (n - 1) // 2)
+
+
+def _summarize_numpy(rates, weights, percentiles, trim) -> Dict[str, Any]:
+    np = load_numpy()
+    values = np.asarray(rates, dtype=np.float64)
+    ordered = np.sort(values)
+    n = len(ordered)
+    cut = _trim_count(n, trim)
+    quantiles = np.percentile(ordered, [50, *percentiles])
+    vwap = float(np.average(values, weights=np.asarray(weights, dtype=np.float64))) if weights is not None else float(values.mean())
+
+    return {
+        "count": n,
+        "mean": float(values.mean()),
+        "median": float(quantiles[0]),
+        "min": float(ordered[0]),
+        "max": float(ordered[-1]),
+        "stddev": float(values.std()),
+        "trimmed_mean": float(ordered[cut:n - cut].mean()),
+        "vwap": vwap,
+        "percentiles": {f"p{p:g}": float(q) for p, q in zip(percentiles, quantiles[1:])}
+    }
+
+
+def _percentile(ordered: Sequence[float], p: float) -> float:
+    """Linearly interpolated percentile of an already sorted sequence."""
+    position = (len(ordered) - 1) * p / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _moments(rates, weights) -> Tuple[float, float, float]:
+    """Single Welford pass over rates: (mean, population variance, weighted average)."""
+    mean = m2 = weighted = weight_total = 0.0
+    if weights is None:
+        weights = (1.0,) * len(rates)
+
+    for n, (rate, weight) in enumerate(zip(rates, weights), 1):
+        delta = rate - mean
+        mean += delta / n
+        m2 += delta * (rate - mean)
+        weighted += rate * weight
+        weight_total += weight
+    return mean, m2 / len(rates), weighted / weight_total
+
+
+def _summarize_python(rates, weights, percentiles, trim) -> Dict[str, Any]:
+    ordered = sorted(rates)
+    n = len(ordered)
+    cut = _trim_count(n, trim)
+    mean, variance, vwap = _moments(rates, weights)
+
+    return {
+        "count": n,
+        "mean": mean,
+        "median": _percentile(ordered, 50),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "stddev": math.sqrt(variance),
+        "trimmed_mean": math.fsum(ordered[cut:n - cut]) / (n - 2 * cut),
+        "vwap": vwap,
+        "percentiles": {f"p{p:g}": _percentile(ordered, p) for p in percentiles}
+    }
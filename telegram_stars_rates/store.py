@@ -0,0 +1,224 @@
+"""
+⭐ Telegram Stars Rates - Persistent Fragment transaction store
+
+SQLite store of parsed Fragment transactions keyed by event hash, with an
+incremental sync that only fetches events newer than the last seen logical time
+and backfills older ones when a caller asks for more history than is stored.
+"""
+
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Any, Iterable, Tuple, TYPE_CHECKING
+
+from .analyzer import FRAGMENT_ADDRESS, TRANSACTION_FIELDS, Transaction, iter_fragment_events, _parse_record
+
+if TYPE_CHECKING:
+    import requests
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    hash TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    lt INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    stars INTEGER NOT NULL,
+    ton REAL NOT NULL,
+    rate_per_star REAL NOT NULL,
+    reference TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_address_lt ON transactions (address, lt);
+CREATE TABLE IF NOT EXISTS sync_state (
+    address TEXT PRIMARY KEY,
+    last_lt INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history_state (
+    address TEXT PRIMARY KEY,
+    first_lt INTEGER NOT NULL,
+    first_timestamp INTEGER NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Stores created before history_state existed start from their oldest transaction
+SEED_HISTORY = """
+INSERT OR IGNORE INTO history_state (address, first_lt, first_timestamp)
+SELECT address, MIN(lt), MIN(timestamp) FROM transactions GROUP BY address
+"""
+
+
+class TransactionStore:
+    """Local store of Fragment Stars transactions.
+
+    Usage:
+        store = TransactionStore("fragment.sqlite3")
+        store.sync()
+        transactions = store.transactions(limit=100)
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(SEED_HISTORY)
+
+    def last_lt(self, address: str = FRAGMENT_ADDRESS) -> Optional[int]:
+        """Logical time of the newest event seen for address, or None before the first sync."""
+        with self._lock:
+            row = self._conn.execute("SELECT last_lt FROM sync_state WHERE address = ?", (address,)).fetchone()
+        return row[0] if row else None
+
+    def add_events(self, events: Iterable[Dict[str, Any]], address: str = FRAGMENT_ADDRESS) -> int:
+        """Parse and store events, advancing the sync cursors. Returns the number of new transactions."""
+        rows = []
+        max_lt = min_lt = min_timestamp = None
+        for event in events:
+            lt = int(event.get("lt", 0))
+            max_lt = lt if max_lt is None else max(max_lt, lt)
+            min_lt = lt if min_lt is None else min(min_lt, lt)
+            timestamp = int(event.get("timestamp", 0))
+            min_timestamp = timestamp if min_timestamp is None else min(min_timestamp, timestamp)
+            if tx := _parse_record(event):
+                rows.append((tx["hash"], address, lt, tx["timestamp"], tx["stars"], tx["ton"], tx["rate_per_star"], tx["reference"]))
+
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self._conn.total_changes - before
+            if max_lt is not None:
+                self._conn.execute(
+                    "INSERT INTO sync_state VALUES (?, ?) "
+                    "ON CONFLICT(address) DO UPDATE SET last_lt = max(last_lt, excluded.last_lt)",
+                    (address, max_lt)
+                )
+                self._conn.execute(
+                    "INSERT INTO history_state (address, first_lt, first_timestamp) VALUES (?, ?, ?) "
+                    "ON CONFLICT(address) DO UPDATE SET first_lt = min(first_lt, excluded.first_lt), "
+                    "first_timestamp = min(first_timestamp, excluded.first_timestamp)",
+                    (address, min_lt, min_timestamp)
+                )
+        return added
+
+    def sync(
+        self,
+        fragment_address: str = FRAGMENT_ADDRESS,
+        rate_limit_delay: float = 2.0,
+        api_key: Optional[str] = None,
+        initial_limit: Optional[int] = 100,
+        since: Optional[int] = None,
+        session: Optional["requests.Session"] = None
+    ) -> int:
+        """Fetch events newer than the stored cursor. Returns the number of new transactions.
+
+        The first sync fetches `initial_limit` events (or back to `since`); later
+        syncs fetch every event since the previous one whatever `since` is, as
+        the cursor moves to the newest event and nothing older than it would
+        be fetched forward again, so no gap is left. When
+        fewer than `initial_limit` transactions are stored (since `since`, if
+        given), older events are then fetched from before the oldest stored one
+        until there are enough, `since` is reached or the history runs out.
+        """
+        last_lt = self.last_lt(fragment_address)
+        limit = initial_limit if last_lt is None else None
+        events = iter_fragment_events(
+            limit, fragment_address, rate_limit_delay, api_key, since if last_lt is None else None,
+            session=session, after_lt=last_lt
+        )
+        # Materialize before writing so a failed fetch never advances the cursor
+        events = list(events)
+        added = self.add_events(events, fragment_address)
+        if last_lt is None and (limit is None or len(events) < limit):
+            self._mark_exhausted(fragment_address, since)
+        return added + self._backfill(fragment_address, rate_limit_delay, api_key, initial_limit, since, session)
+
+    def _backfill(
+        self,
+        address: str,
+        rate_limit_delay: float,
+        api_key: Optional[str],
+        limit: Optional[int],
+        since: Optional[int],
+        session: Optional["requests.Session"]
+    ) -> int:
+        """Fetch events older than the stored ones until `limit` transactions since `since` are stored."""
+        history = self._history(address)
+        if history is None or history[2] or (since is not None and history[1] <= since):
+            return 0
+        missing = None if limit is None else limit - self._count(address, since)
+        if missing is not None and missing <= 0:
+            return 0
+
+        batch = []
+        found = 0
+        exhausted = True
+        for event in iter_fragment_events(None, address, rate_limit_delay, api_key, since, session=session, before_lt=history[0]):
+            batch.append(event)
+            found += _parse_record(event) is not None
+            if missing is not None and found >= missing:
+                exhausted = False
+                break
+        added = self.add_events(batch, address)
+        if exhausted:
+            self._mark_exhausted(address, since)
+        return added
+
+    def _mark_exhausted(self, address: str, since: Optional[int]):
+        """Record that a fetch ran into `since` or the start of the account, so it is not fetched again."""
+        with self._lock, self._conn:
+            if since is None:
+                self._conn.execute("UPDATE history_state SET complete = 1 WHERE address = ?", (address,))
+            else:
+                self._conn.execute(
+                    "UPDATE history_state SET first_timestamp = min(first_timestamp, ?) WHERE address = ?",
+                    (since, address)
+                )
+
+    def _history(self, address: str) -> Optional[Tuple[int, int, bool]]:
+        """Oldest stored logical time and timestamp for address, and whether the history is complete."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT first_lt, first_timestamp, complete FROM history_state WHERE address = ?", (address,)
+            ).fetchone()
+        return (row[0], row[1], bool(row[2])) if row else None
+
+    def _count(self, address: str, since: Optional[int]) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM transactions WHERE address = ? AND timestamp >= ?",
+                (address, since if since is not None else 0)
+            ).fetchone()[0]
+
+    def transactions(
+        self,
+        address: str = FRAGMENT_ADDRESS,
+        limit: Optional[int] = None,
+        since: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Stored transactions for address, newest first, as parse_fragment_transaction results."""
+        return [record.as_dict() for record in self.records(address, limit, since)]
+
+    def records(
+        self,
+        address: str = FRAGMENT_ADDRESS,
+        limit: Optional[int] = None,
+        since: Optional[int] = None
+    ) -> List[Transaction]:
+        """transactions() as compact Transaction records."""
+        query = f"SELECT {', '.join(TRANSACTION_FIELDS)} FROM transactions WHERE address = ?"
+        params: List[Any] = [address]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        query += " ORDER BY lt DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [Transaction._make(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,37 @@
+"""
+⭐ Telegram Stars Rates - Streaming rate watch
+"""
+
+import time
+from typing import Optional, Dict, Any, Iterator
+
+from .analyzer import get_stars_rate
+from .session import get_session
+from .store import TransactionStore
+
+
+def watch_rates(
+    interval: float,
+    limit: int = 50,
+    store: Optional[TransactionStore] = None,
+    ticks: Optional[int] = None,
+    **kwargs
+) -> Iterator[Dict[str, Any]]:
+    """Yield a get_stars_rate result every `interval` seconds.
+
+    Fragment events are kept in `store` (in memory by default) so each tick
+    only fetches events newer than the previous one. Ticks are scheduled on a
+    fixed cadence; a slow tick delays the next one rather than piling up.
+    """
+    store = store or TransactionStore()
+    kwargs["session"] = kwargs.get("session") or get_session()
+    next_tick = time.monotonic()
+    count = 0
+
+    while ticks is None or count < ticks:
+        yield get_stars_rate(limit=limit, store=store, **kwargs)
+        count += 1
+
+        next_tick = max(next_tick + interval, time.monotonic())
+        if ticks is None or count < ticks:
+            time.sleep(max(0.0, next_tick - time.monotonic()))
@@ -0,0 +1,193 @@
+"""
+⭐ Telegram Stars Rates - Rolling time window
+
+Keeps the Stars transactions of the last `seconds` with running sums and a
+sorted copy of their rates, so adding a transaction or evicting an expired
+one updates the statistics incrementally instead of recomputing the window.
+Other estimators are kept as streaming instances fed the same way.
+"""
+
+import bisect
+import math
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable, Iterable, Sequence
+
+from .estimators import EstimatorSpec, RateEstimator, create_estimator
+from .outliers import HampelFilter, OutlierSpec, is_plausible
+from .stats import DEFAULT_PERCENTILES, _percentile, _trim_count
+
+# Estimators a RollingWindow reads from summary(); others come from estimator()
+WINDOW_ESTIMATORS = ("mean", "vwap", "median", "trimmed_mean")
+
+
+class RollingWindow:
+    """Rate statistics over the transactions of a sliding time window.
+
+    Transactions are fed oldest first; ones already seen (by hash) or
+    already outside the window are ignored. Keep one instance across
+    refreshes and pass it as stars_to_ton_fragment(window=...) to only fetch
+    transactions newer than the ones it holds. extend() screens new
+    transactions with one long-lived `outlier_filter`, so they are judged
+    against the rates that came before them. Estimators taken from
+    estimator() are kept too, and follow every add and eviction.
+
+    Usage:
+        last_hour = RollingWindow(3600)
+        result = stars_to_ton_fragment(window=last_hour)
+    """
+
+    def __init__(
+        self,
+        seconds: float,
+        clock: Callable[[], float] = time.time,
+        outlier_filter: OutlierSpec = HampelFilter
+    ):
+        if seconds <= 0:
+            raise ValueError("Window length must be positive")
+        self.seconds = seconds
+        self.clock = clock
+        self.outliers = outlier_filter() if outlier_filter is not None else None
+        self._transactions = deque()
+        self._hashes = set()
+        # Rejected hash -> timestamp, so a refetched outlier is not judged twice
+        self._rejected: Dict[str, int] = {}
+        self._ordered: List[float] = []
+        self._estimators: Dict[Any, RateEstimator] = {}
+        self._reset_sums()
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    @property
+    def newest(self) -> Optional[int]:
+        """Timestamp of the newest transaction held, or None when empty."""
+        return self._transactions[-1]["timestamp"] if self._transactions else None
+
+    @property
+    def rejected_count(self) -> int:
+        """How many transactions within the window were rejected by extend()."""
+        return len(self._rejected)
+
+    def since(self, now: Optional[float] = None) -> int:
+        """Unix timestamp to fetch from: the newest held transaction or the window start."""
+        start = int((self.clock() if now is None else now) - self.seconds)
+        return max(start, self.newest or start)
+
+    def add(self, tx: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """Add a parse_fragment_transaction result. Returns False if it was skipped."""
+        now = self.clock() if now is None else now
+        if tx["hash"] in self._hashes or tx["timestamp"] < now - self.seconds:
+            return False
+
+        rate, stars = tx["rate_per_star"], tx["stars"]
+        if not self._transactions:
+            # Sums are kept relative to a recent rate so the variance stays accurate
+            self._shift = rate
+        self._transactions.append(tx)
+        self._hashes.add(tx["hash"])
+        bisect.insort(self._ordered, rate)
+        self._update_sums(rate, stars, 1)
+        for kept in self._estimators.values():
+            kept.add_transaction(tx)
+        return True
+
+    def extend(self, transactions: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """Add new transactions, oldest first, without implausible rates or outliers.
+
+        Returns how many new transactions were rejected.
+        """
+        now = self.clock() if now is None else now
+        cutoff = now - self.seconds
+        new = [
+            tx for tx in transactions
+            if tx["hash"] not in self._hashes and tx["hash"] not in self._rejected and tx["timestamp"] >= cutoff
+        ]
+        kept = [tx for tx in new if is_plausible(tx["rate_per_star"])]
+        if self.outliers is not None:
+            kept = list(self.outliers.filter(kept))
+
+        kept_hashes = set()
+        for tx in kept:
+            self.add(tx, now)
+            kept_hashes.add(tx["hash"])
+        for tx in new:
+            if tx["hash"] not in kept_hashes:
+                self._rejected[tx["hash"]] = tx["timestamp"]
+        return len(new) - len(kept)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop transactions older than the window. Returns how many were dropped."""
+        cutoff = (self.clock() if now is None else now) - self.seconds
+        dropped = 0
+        # Transactions arrive in logical time order, so a timestamp may be a few
+        # seconds out of order; such a one is evicted with the next newer one
+        while self._transactions and self._transactions[0]["timestamp"] < cutoff:
+            tx = self._transactions.popleft()
+            self._hashes.discard(tx["hash"])
+            del self._ordered[bisect.bisect_left(self._ordered, tx["rate_per_star"])]
+            self._update_sums(tx["rate_per_star"], tx["stars"], -1)
+            for kept in self._estimators.values():
+                kept.remove_transaction(tx)
+            dropped += 1
+        if self._rejected:
+            self._rejected = {tx_hash: timestamp for tx_hash, timestamp in self._rejected.items() if timestamp >= cutoff}
+        if not self._transactions:
+            # Start over from exact zeros instead of carrying rounding error
+            self._reset_sums()
+        return dropped
+
+    def estimator(self, estimator: EstimatorSpec) -> RateEstimator:
+        """Estimator over the transactions in the window, kept up to date from then on.
+
+        Created on first use from a name in estimators.ESTIMATORS or a factory;
+        it has to support remove() so expired transactions can be taken out.
+        """
+        if estimator not in self._estimators:
+            kept = create_estimator(estimator)
+            if not kept.removable:
+                raise ValueError(f"Estimator {kept.name or type(kept).__name__!r} cannot follow a window, it does not support remove()")
+            for tx in self._transactions:
+                kept.add_transaction(tx)
+            self._estimators[estimator] = kept
+        return self._estimators[estimator]
+
+    def transactions(self) -> List[Dict[str, Any]]:
+        """Transactions in the window, newest first."""
+        return list(reversed(self._transactions))
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES, trim: float = 0.1) -> Dict[str, Any]:
+        """Same statistics as stats.summarize_rates(), read from the running sums."""
+        n = len(self._ordered)
+        if not n:
+            raise ValueError("No rates to summarize")
+        ordered = self._ordered
+        mean = self._shift + self._sum / n
+        variance = max(0.0, self._sum_sq / n - (self._sum / n) ** 2)
+        cut = _trim_count(n, trim)
+        total = self._sum + n * self._shift
+        tails = math.fsum(ordered[:cut]) + math.fsum(ordered[n - cut:]) if cut else 0.0
+
+        return {
+            "count": n,
+            "mean": mean,
+            "median": _percentile(ordered, 50),
+            "min": ordered[0],
+            "max": ordered[-1],
+            "stddev": math.sqrt(variance),
+            "trimmed_mean": (total - tails) / (n - 2 * cut),
+            "vwap": self._ton / self._stars,
+            "percentiles": {f"p{p:g}": _percentile(ordered, p) for p in percentiles}
+        }
+
+    def _update_sums(self, rate: float, stars: float, sign: int):
+        offset = rate - self._shift
+        self._sum += sign * offset
+        self._sum_sq += sign * offset * offset
+        self._ton += sign * rate * stars
+        self._stars += sign * stars
+
+    def _reset_sums(self):
+        self._shift = 0.0
+        self._sum = self._sum_sq = 0.0
+        self._ton = self._stars = 0.0